@@ -5,14 +5,28 @@ live model switching, and optional emotion detection via external APIs.
 """
 
 import os
+import sys
+import asyncio
 import httpx
 import chainlit as cl
-import json
+import orjson
 import time
 import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import IO
 from dotenv import load_dotenv
 
+# uvloop is a drop-in, faster event loop; it has no Windows build
+if sys.platform != "win32":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
 load_dotenv()
 
 # Configure logging
@@ -20,37 +34,133 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # API Configuration
-CHAT_API_URL = os.getenv("CHAT_API_URL")
-MODELS_API_URL = os.getenv("MODELS_API_URL")
-EMOTION_API_URL = os.getenv("EMOTION_API_URL")
-CHAR_API_URL = os.getenv("CHAR_API_URL", "").rstrip("/")
-IDENTITY_API_URL = os.getenv("IDENTITY_API_URL", "").rstrip("/")
-CHAT_API_KEY = os.getenv("CHAT_API_KEY")
-MODELS_API_KEY = os.getenv("MODELS_API_KEY")
-EMOTION_API_KEY = os.getenv("EMOTION_API_KEY")
-CHAR_API_KEY = os.getenv("CHAR_API_KEY")
-IDENTITY_API_KEY = os.getenv("IDENTITY_API_KEY")
-CHAT_TIMEOUT = int(float(os.getenv("CHAT_TIMEOUT", "120")))
-MODELS_TIMEOUT = int(float(os.getenv("MODELS_TIMEOUT", "10")))
-EMOTION_TIMEOUT = int(float(os.getenv("EMOTION_TIMEOUT", "10")))
-EMOTION_ENABLED = os.getenv("EMOTION_ENABLED", "0") == "1"
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Runtime configuration read once from the environment at import."""
+    chat_url: str | None
+    models_url: str | None
+    emotion_url: str | None
+    char_url: str
+    identity_url: str
+    chat_key: str | None
+    models_key: str | None
+    emotion_key: str | None
+    char_key: str | None
+    identity_key: str | None
+    chat_timeout: int
+    models_timeout: int
+    emotion_timeout: int
+    emotion_enabled: bool
+    emotion_batch_max: int
+    emotion_batch_window_ms: float
+    history_max: int
+    char_private_ttl: float
+    char_list_ttl: float
+    models_cache_ttl: float
+    stream_buf_chars: int
+    stream_flush_ms: float
+    state_dir: Path
+    auth_url: str
+    auth_timeout: float
+    admin_key: str
+
+CFG = Config(
+    chat_url=os.getenv("CHAT_API_URL"),
+    models_url=os.getenv("MODELS_API_URL"),
+    emotion_url=os.getenv("EMOTION_API_URL"),
+    char_url=os.getenv("CHAR_API_URL", "").rstrip("/"),
+    identity_url=os.getenv("IDENTITY_API_URL", "").rstrip("/"),
+    chat_key=os.getenv("CHAT_API_KEY"),
+    models_key=os.getenv("MODELS_API_KEY"),
+    emotion_key=os.getenv("EMOTION_API_KEY"),
+    char_key=os.getenv("CHAR_API_KEY"),
+    identity_key=os.getenv("IDENTITY_API_KEY"),
+    chat_timeout=int(float(os.getenv("CHAT_TIMEOUT", "120"))),
+    models_timeout=int(float(os.getenv("MODELS_TIMEOUT", "10"))),
+    emotion_timeout=int(float(os.getenv("EMOTION_TIMEOUT", "10"))),
+    emotion_enabled=os.getenv("EMOTION_ENABLED", "0") == "1",
+    emotion_batch_max=int(os.getenv("EMOTION_BATCH_MAX", "1")),
+    emotion_batch_window_ms=float(os.getenv("EMOTION_BATCH_WINDOW_MS", "20")),
+    history_max=int(os.getenv("HISTORY_MAX", "32")),
+    char_private_ttl=float(os.getenv("CHAR_PRIVATE_TTL", "60")),
+    char_list_ttl=float(os.getenv("CHAR_LIST_TTL", "30")),
+    models_cache_ttl=float(os.getenv("MODELS_CACHE_TTL", "30")),
+    stream_buf_chars=int(os.getenv("STREAM_BUF_CHARS", "32")),
+    stream_flush_ms=float(os.getenv("STREAM_FLUSH_MS", "20")),
+    state_dir=Path(os.getenv("STATE_DIR", "/state")),
+    auth_url=os.getenv("AUTH_API_URL", "http://webbui_auth_api:8001").rstrip("/"),
+    auth_timeout=float(os.getenv("AUTH_TIMEOUT", "5")),
+    admin_key=os.getenv("USER_ADMIN_API_KEY", ""),
+)
+
+@dataclass(slots=True)
+class Msg:
+    """One chat history entry; orjson serializes it as ``{"role", "content"}``."""
+    role: str
+    content: str
+
+EMOTION_BATCH_WINDOW = CFG.emotion_batch_window_ms / 1000
+STREAM_FLUSH_INTERVAL = CFG.stream_flush_ms / 1000
+# Non-system messages kept per session; the system prompt is stored separately
+HISTORY_TURNS = max(CFG.history_max - 1, 1)
 CHAR_CACHE_PATH = Path("/tmp/characters_cache.json")
 CHAR_CACHE_ETAG_PATH = Path("/tmp/characters_cache.etag")
-STATE_DIR = Path(os.getenv("STATE_DIR", "/state"))
-AUTH_API_URL = os.getenv("AUTH_API_URL", "http://webbui_auth_api:8001").rstrip("/")
-AUTH_TIMEOUT = float(os.getenv("AUTH_TIMEOUT", "5"))
-USER_ADMIN_API_KEY = os.getenv("USER_ADMIN_API_KEY", "")
+# Empty when CHAR_API_URL is unset, in which case avatar file names can't be resolved
+_AVATAR_PREFIX = f"{CFG.char_url}/avatars/" if CFG.char_url else ""
+
+# Request headers are fixed for the life of the process; build them once.
+# Treat these as read-only and copy before adding per-request fields.
+_CHAR_HEADERS_BASE = {"x-api-key": CFG.char_key} if CFG.char_key else {}
+_IDENTITY_HEADERS_BASE = {"x-api-key": CFG.identity_key} if CFG.identity_key else {}
+_MODELS_HEADERS_BASE = {"Authorization": f"Bearer {CFG.models_key}"} if CFG.models_key else {}
+_CHAT_HEADERS_BASE = {"Content-Type": "application/json"}
+if CFG.chat_key:
+    _CHAT_HEADERS_BASE["Authorization"] = f"Bearer {CFG.chat_key}"
+_EMOTION_HEADERS_BASE = {"Content-Type": "application/json"}
+if CFG.emotion_key:
+    _EMOTION_HEADERS_BASE["Authorization"] = f"Bearer {CFG.emotion_key}"
+_ADMIN_HEADERS_BASE = {"x-admin-key": CFG.admin_key} if CFG.admin_key else {}
+
+# HTTP clients
+HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=30.0)
+
+def make_timeout(read_timeout: float) -> httpx.Timeout:
+    """Build a timeout with short connect/pool waits and the given read timeout.
+
+    :param read_timeout: Read timeout in seconds
+    :type read_timeout: float
+    :return: Timeout for clients or individual requests
+    :rtype: httpx.Timeout
+    """
+    return httpx.Timeout(connect=5.0, read=read_timeout, write=10.0, pool=5.0)
 
-# HTTP client
-client = httpx.AsyncClient()
+def make_client(read_timeout: float) -> httpx.AsyncClient:
+    """Create a pooled HTTP/2 client with explicit limits and timeouts.
 
-def char_headers():
-    """Generate headers for character API requests.
-    
-    :return: Dictionary with API key header if configured
-    :rtype: dict
+    Requests should not pass a bare ``timeout=`` number, which would replace
+    the whole client timeout including the connect and pool waits.
+
+    :param read_timeout: Read timeout in seconds
+    :type read_timeout: float
+    :return: Configured async HTTP client
+    :rtype: httpx.AsyncClient
     """
-    return {"x-api-key": CHAR_API_KEY} if CHAR_API_KEY else {}
+    return httpx.AsyncClient(limits=HTTP_LIMITS, http2=True, timeout=make_timeout(read_timeout))
+
+# Separate pools per upstream host so keepalive connections don't evict each other
+client = make_client(CFG.models_timeout)
+chat_client = make_client(CFG.chat_timeout)
+char_client = make_client(10)
+identity_client = make_client(10)
+auth_client = make_client(CFG.auth_timeout)
+HTTP_CLIENTS = (client, chat_client, char_client, identity_client, auth_client)
+# Emotion requests share the models client but have their own read timeout
+EMOTION_TIMEOUT = make_timeout(CFG.emotion_timeout)
+
+async def close_http_clients():
+    """Close all pooled HTTP clients."""
+    for c in HTTP_CLIENTS:
+        await c.aclose()
 
 async def fetch_characters_list():
     """Fetch character list from API with ETag caching.
@@ -59,58 +169,110 @@ async def fetch_characters_list():
     :rtype: list[dict]
     :raises Exception: If API is not configured or request fails
     """
-    if not CHAR_API_URL:
+    global _CHAR_CACHE_MEMO, _CHAR_LIST_ETAG
+    if not CFG.char_url:
         raise Exception("CHAR_API_URL not configured")
 
-    url = f"{CHAR_API_URL}/characters"
-    headers = char_headers()
+    url = f"{CFG.char_url}/characters"
+    # Only revalidate when there is cached data to fall back on
     etag = load_cached_etag()
-    if etag:
-        headers["If-None-Match"] = etag
+    if etag and not load_cached_characters():
+        etag = ""
+    headers = {**_CHAR_HEADERS_BASE, "If-None-Match": etag} if etag else _CHAR_HEADERS_BASE
 
-    resp = await client.get(url, headers=headers, timeout=10)
+    resp = await char_client.get(url, headers=headers)
 
     if resp.status_code == 304:
-        logger.info("Characters list unchanged (304); using cache")
-        return load_cached_characters()
+        chars = load_cached_characters()
+        if chars:
+            logger.info("Characters list unchanged (304); using cache")
+            return chars
+        # The cache file vanished after the request went out; fetch the full list
+        logger.warning("Characters list unchanged (304) but cache is empty; refetching")
+        _CHAR_LIST_ETAG = ""
+        resp = await char_client.get(url, headers=_CHAR_HEADERS_BASE)
 
     resp.raise_for_status()
 
     new_etag = resp.headers.get("etag", "")
     save_cached_etag(new_etag)
 
-    data = resp.json()
-    chars = data.get("characters", [])
-    CHAR_CACHE_PATH.write_text(json.dumps(chars), encoding="utf-8")
+    # Cache the raw response body; parsing it once is enough
+    body = resp.content
+    CHAR_CACHE_PATH.write_bytes(body)
+    chars = add_profile_icons(orjson.loads(body).get("characters", []))
+    _CHAR_CACHE_MEMO = (CHAR_CACHE_PATH.stat().st_mtime_ns, chars)
     logger.info(f"Fetched {len(chars)} characters from API (etag={new_etag})")
     return chars
 
+# Parsed cache file contents, keyed by the file's mtime_ns
+_CHAR_CACHE_MEMO: tuple[int, list[dict]] | None = None
+
 def load_cached_characters():
     """Load characters from local cache file.
     
+    The cache holds the raw ``/characters`` response; older caches stored the bare list.
+    The parsed list is kept in memory and only re-read when the file's mtime changes.
+    
     :return: List of cached character dictionaries
     :rtype: list[dict]
     """
-    if CHAR_CACHE_PATH.exists():
-        return json.loads(CHAR_CACHE_PATH.read_text(encoding="utf-8"))
-    return []
+    global _CHAR_CACHE_MEMO
+    try:
+        mtime = CHAR_CACHE_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    if _CHAR_CACHE_MEMO and _CHAR_CACHE_MEMO[0] == mtime:
+        return _CHAR_CACHE_MEMO[1]
+    data = orjson.loads(CHAR_CACHE_PATH.read_bytes())
+    chars = add_profile_icons(data.get("characters", []) if isinstance(data, dict) else data)
+    _CHAR_CACHE_MEMO = (mtime, chars)
+    return chars
+
+def add_profile_icons(chars: list[dict]) -> list[dict]:
+    """Resolve each character's profile icon URL once, when the list is loaded.
+    
+    Stores the result under ``_icon`` so chat profile rendering is a plain lookup.
+    Characters without ``avatar_url`` or ``avatar`` get an empty icon.
+    
+    :param chars: Character dictionaries from the list endpoint
+    :type chars: list[dict]
+    :return: The same list, with ``_icon`` set on every character
+    :rtype: list[dict]
+    """
+    for char in chars:
+        avatar = char.get("avatar")
+        char["_icon"] = char.get("avatar_url") or (_AVATAR_PREFIX + avatar if _AVATAR_PREFIX and avatar else "")
+    return chars
+
+# In-memory copy of the list ETag; the file is only read once per process
+_CHAR_LIST_ETAG: str | None = None
 
 def load_cached_etag():
-    """Load cached ETag from file.
+    """Load cached ETag, reading the file only on first use.
     
     :return: Cached ETag string or empty string
     :rtype: str
     """
-    return CHAR_CACHE_ETAG_PATH.read_text(encoding="utf-8").strip() if CHAR_CACHE_ETAG_PATH.exists() else ""
+    global _CHAR_LIST_ETAG
+    if _CHAR_LIST_ETAG is None:
+        try:
+            _CHAR_LIST_ETAG = CHAR_CACHE_ETAG_PATH.read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            _CHAR_LIST_ETAG = ""
+    return _CHAR_LIST_ETAG
 
 def save_cached_etag(etag: str):
-    """Save ETag to cache file.
+    """Save ETag to memory and the cache file.
     
     :param etag: ETag value to cache
     :type etag: str
     """
-    if etag:
-        CHAR_CACHE_ETAG_PATH.write_text(etag.strip(), encoding="utf-8")
+    global _CHAR_LIST_ETAG
+    etag = etag.strip()
+    if etag and etag != _CHAR_LIST_ETAG:
+        _CHAR_LIST_ETAG = etag
+        CHAR_CACHE_ETAG_PATH.write_text(etag, encoding="utf-8")
 
 async def fetch_character_private(char_id: str):
     """Fetch full character data with prompts from API with ETag caching.
@@ -121,104 +283,172 @@ async def fetch_character_private(char_id: str):
     :rtype: dict
     :raises Exception: If API request fails
     """
-    global CHAR_PRIVATE_ETAGS, CHAR_PRIVATE_CACHE
-    url = f"{CHAR_API_URL}/characters/{char_id}?view=private"
-    headers = char_headers()
-    etag = CHAR_PRIVATE_ETAGS.get(char_id)
-    if etag:
-        headers["If-None-Match"] = etag
+    global CHAR_PRIVATE_ETAGS, CHAR_PRIVATE_CACHE, CHAR_PRIVATE_EXPIRY
+    cached = CHAR_PRIVATE_CACHE.get(char_id)
+    if cached and time.monotonic() < CHAR_PRIVATE_EXPIRY.get(char_id, 0):
+        return cached
 
-    resp = await client.get(url, headers=headers, timeout=10)
+    url = f"{CFG.char_url}/characters/{char_id}?view=private"
+    # Only revalidate when there is cached data to fall back on
+    etag = CHAR_PRIVATE_ETAGS.get(char_id) if cached else None
+    headers = {**_CHAR_HEADERS_BASE, "If-None-Match": etag} if etag else _CHAR_HEADERS_BASE
+
+    resp = await char_client.get(url, headers=headers)
     if resp.status_code == 304:
-        cached = CHAR_PRIVATE_CACHE.get(char_id)
-        if cached:
-            logger.info(f"Character {char_id} not modified (ETag cache hit); using cached private data")
-            return cached
-        # cache miss: fall back to a normal fetch
-        resp = await client.get(url, headers=char_headers(), timeout=10)
+        logger.info(f"Character {char_id} not modified (ETag cache hit); using cached private data")
+        CHAR_PRIVATE_EXPIRY[char_id] = time.monotonic() + CFG.char_private_ttl
+        return cached
 
     resp.raise_for_status()
     CHAR_PRIVATE_ETAGS[char_id] = resp.headers.get("etag") or ""
-    data = resp.json()
+    data = orjson.loads(resp.content)
     CHAR_PRIVATE_CACHE[char_id] = data
+    CHAR_PRIVATE_EXPIRY[char_id] = time.monotonic() + CFG.char_private_ttl
     return data
 
+# (expiry, model names) from the last successful models request
+_MODELS_CACHE: tuple[float, list[str]] | None = None
+_MODELS_LOCK = asyncio.Lock()
+
 async def fetch_models():
     """Fetch available models from external API.
     
+    Results are cached for ``MODELS_CACHE_TTL`` seconds and shared by concurrent
+    chat starts; failed requests are not cached.
+    
     :return: List of model names available from the API
     :rtype: list[str]
     """
-    if not MODELS_API_URL:
+    global _MODELS_CACHE
+    if not CFG.models_url:
         logger.error("MODELS_API_URL not configured")
         return []
     
-    try:
-        headers = {"Authorization": f"Bearer {MODELS_API_KEY}"} if MODELS_API_KEY else {}
-        response = await client.get(MODELS_API_URL, headers=headers, timeout=MODELS_TIMEOUT)
-        response.raise_for_status()
-        data = response.json()
-        models = data.get("models", [])
-        logger.info(f"Fetched {len(models)} models from API")
-        return models
-    except Exception as e:
-        logger.error(f"Failed to fetch models: {e}")
-        return []
+    if _MODELS_CACHE and time.monotonic() < _MODELS_CACHE[0]:
+        return _MODELS_CACHE[1]
+    
+    async with _MODELS_LOCK:
+        # Another session may have refreshed the cache while we waited
+        if _MODELS_CACHE and time.monotonic() < _MODELS_CACHE[0]:
+            return _MODELS_CACHE[1]
+        try:
+            response = await client.get(CFG.models_url, headers=_MODELS_HEADERS_BASE)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            models = data.get("models", [])
+            logger.info(f"Fetched {len(models)} models from API")
+            _MODELS_CACHE = (time.monotonic() + CFG.models_cache_ttl, models)
+            return models
+        except Exception as e:
+            logger.error(f"Failed to fetch models: {e}")
+            return []
+
+async def aiter_byte_lines(response: httpx.Response):
+    """Split a streamed response body into lines without decoding it.
+    
+    orjson parses bytes directly, so skipping the str round-trip of
+    ``aiter_lines()`` saves a decode and a copy per line.
+    
+    :param response: Open streaming response
+    :type response: httpx.Response
+    :yield: Non-empty lines with surrounding whitespace stripped
+    :rtype: bytes
+    """
+    pending = b""
+    async for data in response.aiter_bytes():
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield line
+    pending = pending.strip()
+    if pending:
+        yield pending
+
+# Consecutive chunks that must each extend the previous one before a stream
+# is treated as cumulative (full reply so far) rather than delta tokens
+CUMULATIVE_CONFIRM_CHUNKS = 3
 
 async def stream_chat(model, messages):
     """Stream chat responses from external API (Ollama-compatible).
     
     :param model: Name of the model to use for chat
     :type model: str
-    :param messages: List of message dictionaries with role and content
-    :type messages: list[dict]
+    :param messages: Chat history entries with role and content
+    :type messages: list[Msg]
     :yield: Token strings from the streaming response
     :rtype: str
     :raises Exception: If API request fails or times out
     """
-    if not CHAT_API_URL:
+    if not CFG.chat_url:
         raise Exception("CHAT_API_URL not configured")
     
-    headers = {"Content-Type": "application/json"}
-    if CHAT_API_KEY:
-        headers["Authorization"] = f"Bearer {CHAT_API_KEY}"
-    
     payload = {"model": model, "messages": messages, "stream": True}
+    # orjson encodes the Msg dataclasses directly, with no per-message dict copy
     
     try:
-        async with client.stream("POST", CHAT_API_URL, json=payload, headers=headers, timeout=CHAT_TIMEOUT) as response:
+        async with chat_client.stream("POST", CFG.chat_url, content=orjson.dumps(payload), headers=_CHAT_HEADERS_BASE) as response:
             response.raise_for_status()
-            last = ""
-            async for line in response.aiter_lines():
-                if not line.strip():
-                    continue
-                if line.startswith("data: "):
+            # Chunks are delta tokens unless CUMULATIVE_CONFIRM_CHUNKS in a row each
+            # extend the previous one; such a run is held back until the mode is clear
+            is_cumulative = False
+            prev = ""
+            base_len = 0
+            held: list[str] = []
+            async for line in aiter_byte_lines(response):
+                if line.startswith(b"data: "):
                     line = line[6:]
-                if line == "[DONE]":
+                if line == b"[DONE]":
                     break
                 
                 try:
-                    chunk = json.loads(line)
-                except json.JSONDecodeError:
+                    chunk = orjson.loads(line)
+                except orjson.JSONDecodeError:
                     continue
                 
                 # Ollama NDJSON: {"message":{"content":"..."}, "done":false}
                 msg = (chunk.get("message") or {})
                 content = msg.get("content")
                 if content is not None:
-                    # emit only new part
-                    if content.startswith(last):
-                        delta = content[len(last):]
-                    else:
-                        delta = content
-                    last = content
-                    if delta:
-                        yield delta
+                    if not content:
+                        continue
+                    if is_cumulative:
+                        if content.startswith(prev):
+                            # emit only new part
+                            delta = content[len(prev):]
+                        else:
+                            # Content no longer extends the reply: these are delta tokens after all
+                            is_cumulative = False
+                            delta = content
+                        prev = content
+                        if delta:
+                            yield delta
+                        continue
+                    if prev and len(content) > len(prev) and content.startswith(prev):
+                        if not held:
+                            # Everything up to here was emitted; a cumulative reply continues after it
+                            base_len = len(prev)
+                        held.append(content)
+                        prev = content
+                        if len(held) >= CUMULATIVE_CONFIRM_CHUNKS:
+                            is_cumulative = True
+                            held.clear()
+                            yield content[base_len:]
+                        continue
+                    # Not a cumulative run: anything held back was ordinary tokens
+                    for token in held:
+                        yield token
+                    held.clear()
+                    prev = content
+                    yield content
                     continue
                 
                 # fallback if some other format appears
                 if "token" in chunk:
                     yield chunk["token"]
+            for token in held:
+                yield token
     except httpx.TimeoutException:
         logger.error("Chat API timeout")
         raise Exception("Request timed out")
@@ -227,39 +457,153 @@ async def stream_chat(model, messages):
         # Fallback to non-streaming
         try:
             payload["stream"] = False
-            response = await client.post(CHAT_API_URL, json=payload, headers=headers, timeout=CHAT_TIMEOUT)
+            response = await chat_client.post(CFG.chat_url, content=orjson.dumps(payload), headers=_CHAT_HEADERS_BASE)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             if "reply" in data:
                 yield data["reply"]
         except Exception as fallback_error:
             logger.error(f"Non-streaming fallback failed: {fallback_error}")
             raise
 
+EMOTION_CACHE_MAX = 512
+# Recent results by text, oldest first; repeated replies skip the API
+_EMOTION_CACHE: OrderedDict[str, dict] = OrderedDict()
+
+def should_classify(reply: str) -> bool:
+    """Check whether a reply is worth sending to the emotion API.
+    
+    Very short replies and error/status messages carry no useful emotion signal.
+    
+    :param reply: Assistant reply text
+    :type reply: str
+    :return: True if the reply should be classified
+    :rtype: bool
+    """
+    return len(reply) >= 16 and not reply.startswith(("⚠️", "❌"))
+
 async def detect_emotion(text):
     """Detect emotion from text using external API.
     
+    Successful results are kept in a small LRU cache keyed by text.
+    
     :param text: Text content to analyze for emotion
     :type text: str
     :return: Dictionary with emotion label and confidence score, or None if disabled/failed
     :rtype: dict or None
     """
-    if not EMOTION_ENABLED or not EMOTION_API_URL:
+    if not CFG.emotion_enabled or not CFG.emotion_url:
         return None
     
+    cached = _EMOTION_CACHE.get(text)
+    if cached is not None:
+        _EMOTION_CACHE.move_to_end(text)
+        return cached
+    
+    if CFG.emotion_batch_max > 1:
+        result = await _detect_emotion_batched(text)
+    else:
+        result = await _detect_emotion_single(text)
+    
+    if result is not None:
+        _EMOTION_CACHE[text] = result
+        if len(_EMOTION_CACHE) > EMOTION_CACHE_MAX:
+            _EMOTION_CACHE.popitem(last=False)
+    return result
+
+async def _detect_emotion_single(text):
+    """Send one text to the emotion API.
+    
+    :param text: Text content to analyze for emotion
+    :type text: str
+    :return: Dictionary with emotion label and confidence score, or None if failed
+    :rtype: dict or None
+    """
     try:
-        headers = {"Content-Type": "application/json"}
-        if EMOTION_API_KEY:
-            headers["Authorization"] = f"Bearer {EMOTION_API_KEY}"
-        
-        response = await client.post(EMOTION_API_URL, json={"text": text}, headers=headers, timeout=EMOTION_TIMEOUT)
+        response = await client.post(CFG.emotion_url, content=orjson.dumps({"text": text}), headers=_EMOTION_HEADERS_BASE, timeout=EMOTION_TIMEOUT)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return {"label": data.get("label"), "score": data.get("score")}
     except Exception as e:
         logger.warning(f"Emotion detection failed: {e}")
         return None
 
+_emotion_queue: asyncio.Queue | None = None
+_emotion_worker: asyncio.Task | None = None
+
+async def _detect_emotion_batched(text):
+    """Queue text for the emotion batch worker and wait for its result.
+    
+    :param text: Text content to analyze for emotion
+    :type text: str
+    :return: Dictionary with emotion label and confidence score, or None if failed
+    :rtype: dict or None
+    """
+    global _emotion_queue, _emotion_worker
+    if _emotion_worker is None or _emotion_worker.done():
+        _emotion_queue = asyncio.Queue()
+        _emotion_worker = asyncio.create_task(_emotion_batch_worker(_emotion_queue))
+    fut = asyncio.get_running_loop().create_future()
+    await _emotion_queue.put((text, fut))
+    return await fut
+
+async def _emotion_batch_worker(queue: asyncio.Queue):
+    """Coalesce queued emotion requests into batch POSTs.
+    
+    Collects up to EMOTION_BATCH_MAX texts within EMOTION_BATCH_WINDOW_MS and
+    resolves each caller's future with its result. Identical texts in a batch
+    are sent once and share the result. If the worker stops, pending callers
+    get None.
+    
+    :param queue: Queue of (text, future) pairs
+    :type queue: asyncio.Queue
+    """
+    loop = asyncio.get_running_loop()
+    items = []
+    try:
+        while True:
+            items = [await queue.get()]
+            deadline = loop.time() + EMOTION_BATCH_WINDOW
+            while len(items) < CFG.emotion_batch_max:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            unique = list(dict.fromkeys(text for text, _ in items))
+            results = dict(zip(unique, await _post_emotion_batch(unique)))
+            for text, fut in items:
+                if not fut.done():
+                    fut.set_result(results[text])
+    finally:
+        # Never leave a caller waiting on a worker that has stopped
+        while not queue.empty():
+            items.append(queue.get_nowait())
+        for _, fut in items:
+            if not fut.done():
+                fut.set_result(None)
+
+async def _post_emotion_batch(texts: list[str]) -> list[dict | None]:
+    """Send a batch of texts to the emotion API.
+    
+    :param texts: Text contents to analyze
+    :type texts: list[str]
+    :return: One emotion result (or None) per input text
+    :rtype: list[dict or None]
+    """
+    try:
+        response = await client.post(CFG.emotion_url, content=orjson.dumps({"texts": texts}), headers=_EMOTION_HEADERS_BASE, timeout=EMOTION_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        items = data.get("results", []) if isinstance(data, dict) else data
+        results = [{"label": d.get("label"), "score": d.get("score")} if isinstance(d, dict) else None for d in items]
+        return (results + [None] * len(texts))[:len(texts)]
+    except Exception as e:
+        logger.warning(f"Batched emotion detection failed: {e}")
+        return [None] * len(texts)
+
 async def identity_resolve(external_id: str):
     """Resolve external user ID to identity data.
     
@@ -268,18 +612,16 @@ async def identity_resolve(external_id: str):
     :return: Identity data with person_id and preferred_name, or empty dict if unavailable
     :rtype: dict
     """
-    if not IDENTITY_API_URL:
+    if not CFG.identity_url:
         return {}
-    headers = {"x-api-key": IDENTITY_API_KEY} if IDENTITY_API_KEY else {}
     try:
-        r = await client.get(
-            f"{IDENTITY_API_URL}/identity/resolve",
+        r = await identity_client.get(
+            f"{CFG.identity_url}/identity/resolve",
             params={"external_id": external_id},
-            headers=headers,
-            timeout=10,
+            headers=_IDENTITY_HEADERS_BASE,
         )
         r.raise_for_status()
-        return r.json()
+        return orjson.loads(r.content)
     except Exception as e:
         logger.warning(f"Identity resolve failed for {external_id}: {e}")
         return {}
@@ -294,18 +636,16 @@ async def identity_link(external_id: str, preferred_name: str):
     :return: Identity data from link operation, or empty dict if failed
     :rtype: dict
     """
-    if not IDENTITY_API_URL:
+    if not CFG.identity_url:
         return {}
-    headers = {"x-api-key": IDENTITY_API_KEY} if IDENTITY_API_KEY else {}
     try:
-        r = await client.post(
-            f"{IDENTITY_API_URL}/identity/link",
+        r = await identity_client.post(
+            f"{CFG.identity_url}/identity/link",
             json={"external_id": external_id, "preferred_name": preferred_name},
-            headers=headers,
-            timeout=10,
+            headers=_IDENTITY_HEADERS_BASE,
         )
         r.raise_for_status()
-        return r.json() if r.text else {}
+        return orjson.loads(r.content) if r.content else {}
     except Exception as e:
         logger.warning(f"Identity link failed for {external_id}: {e}")
         return {}
@@ -323,27 +663,24 @@ async def identity_ensure(external_id: str, username: str | None):
     :return: Identity data with person_id and preferred_name, or empty dict if failed
     :rtype: dict
     """
-    if not IDENTITY_API_URL:
+    if not CFG.identity_url:
         return {}
-    headers = {"x-api-key": IDENTITY_API_KEY} if IDENTITY_API_KEY else {}
     try:
-        r = await client.get(
-            f"{IDENTITY_API_URL}/identity/resolve",
+        r = await identity_client.get(
+            f"{CFG.identity_url}/identity/resolve",
             params={"external_id": external_id},
-            headers=headers,
-            timeout=10,
+            headers=_IDENTITY_HEADERS_BASE,
         )
         if r.status_code == 404:
             # Create/link then resolve again
             await identity_link(external_id, username or "there")
-            r = await client.get(
-                f"{IDENTITY_API_URL}/identity/resolve",
+            r = await identity_client.get(
+                f"{CFG.identity_url}/identity/resolve",
                 params={"external_id": external_id},
-                headers=headers,
-                timeout=10,
+                headers=_IDENTITY_HEADERS_BASE,
             )
         r.raise_for_status()
-        return r.json()
+        return orjson.loads(r.content)
     except Exception as e:
         logger.warning(f"Identity ensure failed for {external_id}: {e}")
         return {}
@@ -353,12 +690,50 @@ CHAR_INDEX = {}
 CHAR_LIST = []
 CHAR_PRIVATE_ETAGS = {}
 CHAR_PRIVATE_CACHE = {}
+CHAR_PRIVATE_EXPIRY: dict[str, float] = {}
 PROFILE_NAME_TO_ID = {}
+_CHAR_LOAD_LOCK = asyncio.Lock()
+_CHAR_LIST_EXPIRY = 0.0
+
+async def load_characters():
+    """Refresh the character list and rebuild the lookup indexes.
+    
+    A list fetched within the last ``CHAR_LIST_TTL`` seconds is served from memory.
+    Falls back to the local cache when the API is unreachable. Concurrent
+    callers are serialized so only one list request is in flight.
+    
+    :return: Current character list
+    :rtype: list[dict]
+    """
+    global CHAR_INDEX, CHAR_LIST, PROFILE_NAME_TO_ID, _CHAR_LIST_EXPIRY
+    if CHAR_LIST and time.monotonic() < _CHAR_LIST_EXPIRY:
+        return CHAR_LIST
+    async with _CHAR_LOAD_LOCK:
+        if CHAR_LIST and time.monotonic() < _CHAR_LIST_EXPIRY:
+            return CHAR_LIST
+        previous = CHAR_LIST
+        try:
+            CHAR_LIST = await fetch_characters_list()
+            _CHAR_LIST_EXPIRY = time.monotonic() + CFG.char_list_ttl
+        except Exception as e:
+            logger.warning(f"Failed to fetch characters from API: {e}, using cache")
+            CHAR_LIST = load_cached_characters()
+
+        # Unchanged list (304 or cache hit): the indexes are still valid
+        if CHAR_LIST is previous:
+            return CHAR_LIST
+        CHAR_INDEX = {char["id"]: char for char in CHAR_LIST if "id" in char}
+        PROFILE_NAME_TO_ID = {
+            char["name"]: char["id"]
+            for char in CHAR_LIST
+            if "id" in char and "name" in char
+        }
+    return CHAR_LIST
 
 # Validate configuration
-if not CHAR_API_URL:
+if not CFG.char_url:
     logger.warning("CHAR_API_URL not configured")
-if not CHAR_API_KEY:
+if not CFG.char_key:
     logger.warning("CHAR_API_KEY not configured (character-api may reject requests)")
 
 def session_id() -> str:
@@ -415,7 +790,8 @@ async def send_character_message(content: str, char: dict) -> cl.Message:
     :return: Sent message object
     :rtype: cl.Message
     """
-    msg = cl.Message(content=content, author=character_display_name(char))
+    author_label = cl.user_session.get("author_label") or character_display_name(char)
+    msg = cl.Message(content=content, author=author_label)
     await msg.send()
     return msg
 
@@ -428,10 +804,10 @@ async def register_character_avatar(char: dict):
     author_name = character_display_name(char)
 
     avatar_url = (char.get("avatar_url") or "").strip()
-    if not avatar_url and CHAR_API_URL:
+    if not avatar_url and _AVATAR_PREFIX:
         avatar = str(char.get("avatar") or "").strip()
         if avatar:
-            avatar_url = f"{CHAR_API_URL}/avatars/{avatar}"
+            avatar_url = _AVATAR_PREFIX + avatar
 
     if avatar_url:
         try:
@@ -466,27 +842,45 @@ def _admin_headers():
     :return: Dictionary with x-admin-key header if configured
     :rtype: dict
     """
-    return {"x-admin-key": USER_ADMIN_API_KEY} if USER_ADMIN_API_KEY else {}
+    return _ADMIN_HEADERS_BASE
+
+# Open session log handles keyed by (person_id, char_id, session_id).
+# Only touched from the single event-log thread, which also keeps writes in order.
+_EVENT_HANDLES: dict[tuple[str, str, str], IO[bytes]] = {}
+_EVENT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-log")
+
+def event_meta() -> tuple[str, str, str, str]:
+    """Collect the session fields stamped on every log event.
+    
+    :return: Tuple of (person_id, char_id, external_user_id, session_id)
+    :rtype: tuple[str, str, str, str]
+    """
+    return (
+        cl.user_session.get("person_id") or "unknown_person",
+        cl.user_session.get("char_id") or "unknown_char",
+        cl.user_session.get("external_user_id") or "unknown",
+        session_id(),
+    )
 
-def append_event(sender: str, text: str):
+def append_event(sender: str, text: str, meta: tuple[str, str, str, str] | None = None, flush: bool = False):
     """Append conversation event to session log.
     
     Creates NDJSON log files in /state/sessions/<person_id>/<char_id>/<session_id>.ndjson
-    for persistent conversation history. Gracefully handles failures without disrupting chat.
+    for persistent conversation history. The event is built from the session on the
+    calling thread; the file write runs on a background thread so slow disks never
+    block the event loop. Gracefully handles failures without disrupting chat.
     
     :param sender: Message sender (user, assistant, or system)
     :type sender: str
     :param text: Message content
     :type text: str
+    :param meta: Session fields from :func:`event_meta`; looked up when omitted
+    :type meta: tuple[str, str, str, str] or None
+    :param flush: Flush the session log to disk after this event, e.g. at the end of a turn
+    :type flush: bool
     """
     try:
-        pid = cl.user_session.get("person_id") or "unknown_person"
-        cid = cl.user_session.get("char_id") or "unknown_char"
-        eid = cl.user_session.get("external_user_id") or "unknown"
-        sid = session_id()
-        p = STATE_DIR / "sessions" / pid / cid
-        p.mkdir(parents=True, exist_ok=True)
-        f = p / f"{sid.replace(':', '_')}.ndjson"
+        pid, cid, eid, sid = meta or event_meta()
         evt = {
             "ts": int(time.time() * 1000),
             "source": "chainlit",
@@ -498,13 +892,51 @@ def append_event(sender: str, text: str):
             "text": text,
             "len": len(text),
         }
-        with f.open("a", encoding="utf-8") as w:
-            w.write(json.dumps(evt, ensure_ascii=False) + "\n")
+        _EVENT_EXECUTOR.submit(_write_event, (pid, cid, sid), evt, flush)
     except Exception as e:
         logger.warning(f"Failed to append event: {e}")
 
+def _write_event(key: tuple[str, str, str], evt: dict, flush: bool = False):
+    """Write one event through the session's buffered log handle.
+    
+    The handle is opened on first use and kept for the session, with writes going
+    through a 64 KB buffer that is flushed when ``flush`` is set.
+    
+    :param key: Tuple of (person_id, char_id, session_id)
+    :type key: tuple[str, str, str]
+    :param evt: Event dictionary to serialize
+    :type evt: dict
+    :param flush: Flush the handle after writing
+    :type flush: bool
+    """
+    try:
+        w = _EVENT_HANDLES.get(key)
+        if w is None:
+            pid, cid, sid = key
+            p = CFG.state_dir / "sessions" / pid / cid
+            p.mkdir(parents=True, exist_ok=True)
+            f = p / f"{sid.replace(':', '_')}.ndjson"
+            w = _EVENT_HANDLES[key] = f.open("ab", buffering=65536)
+        w.write(orjson.dumps(evt) + b"\n")
+        if flush:
+            w.flush()
+    except Exception as e:
+        logger.warning(f"Failed to append event: {e}")
+
+def close_event_logs(sid: str | None = None):
+    """Flush and close buffered session log handles.
+    
+    :param sid: Session identifier to close, or None to close all handles
+    :type sid: str or None
+    """
+    for key in [k for k in _EVENT_HANDLES if sid is None or k[2] == sid]:
+        try:
+            _EVENT_HANDLES.pop(key).close()
+        except Exception as e:
+            logger.warning(f"Failed to close event log: {e}")
+
 @cl.password_auth_callback
-def auth_callback(username: str, password: str):
+async def auth_callback(username: str, password: str):
     """Authenticate user via auth API.
     
     :param username: Username to authenticate
@@ -516,16 +948,15 @@ def auth_callback(username: str, password: str):
     """
     logger.info(f"[AUTH] login attempt username={username!r}")
     try:
-        with httpx.Client(timeout=AUTH_TIMEOUT) as c:
-            r = c.post(
-                f"{AUTH_API_URL}/auth/login",
-                json={"username": username, "password": password},
-            )
+        r = await auth_client.post(
+            f"{CFG.auth_url}/auth/login",
+            json={"username": username, "password": password},
+        )
         if r.status_code != 200:
             logger.info(f"[AUTH] failed status={r.status_code}")
             return None
         
-        data = r.json()
+        data = orjson.loads(r.content)
         role = data.get("role", "user")
         logger.info(f"[AUTH] ok role={role}")
         
@@ -534,6 +965,9 @@ def auth_callback(username: str, password: str):
         logger.exception(f"[AUTH] auth_api error: {e}")
         return None
 
+# Profiles built from the character list they were made for; rebuilt only when that list changes
+_PROFILES_CACHE: tuple[list[dict], list] | None = None
+
 @cl.set_chat_profiles
 async def chat_profiles():
     """Define available chat profiles from character API.
@@ -541,40 +975,31 @@ async def chat_profiles():
     :return: List of ChatProfile objects for character selection
     :rtype: list[cl.ChatProfile]
     """
-    global CHAR_INDEX, CHAR_LIST, PROFILE_NAME_TO_ID
-    
-    try:
-        CHAR_LIST = await fetch_characters_list()
-    except Exception as e:
-        logger.warning(f"Failed to fetch characters from API: {e}, using cache")
-        CHAR_LIST = load_cached_characters()
+    global _PROFILES_CACHE
+    await load_characters()
     
     if not CHAR_LIST:
         logger.error("No characters available")
         return []
     
-    CHAR_INDEX = {char["id"]: char for char in CHAR_LIST if "id" in char}
-    PROFILE_NAME_TO_ID = {
-        char["name"]: char["id"]
-        for char in CHAR_LIST
-        if "id" in char and "name" in char
-    }
+    # An unchanged list (ETag 304 or cache file hit) comes back as the same object
+    if _PROFILES_CACHE and _PROFILES_CACHE[0] is CHAR_LIST:
+        return _PROFILES_CACHE[1]
     
     profiles = []
     for char in CHAR_LIST:
         try:
-            icon = char.get("avatar_url") or (f"{CHAR_API_URL}/avatars/{char.get('avatar', '')}" if CHAR_API_URL else "")
-            
             profiles.append(
                 cl.ChatProfile(
                     name=char["name"],
-                    icon=icon,
+                    icon=char.get("_icon", ""),
                     markdown_description=char.get("description", ""),
                     starters=[cl.Starter(label="Greet me", message=char.get("greeting", "Hello there!"))]
                 )
             )
         except Exception as e:
             logger.error(f"Failed to create profile for {char.get('id')}: {e}")
+    _PROFILES_CACHE = (CHAR_LIST, profiles)
     return profiles
 
 @cl.on_chat_start
@@ -584,8 +1009,6 @@ async def start():
     Sets up user session with character data, conversation history,
     and model selection dropdown in sidebar.
     """
-    global CHAR_LIST, CHAR_INDEX, PROFILE_NAME_TO_ID
-
     # Pull authenticated user from Chainlit session (context exists here)
     u = cl.user_session.get("user")
     username = getattr(u, "identifier", None) if u else None
@@ -595,17 +1018,7 @@ async def start():
     cl.user_session.set("auth_role", role)
 
     if not CHAR_LIST:
-        try:
-            CHAR_LIST = await fetch_characters_list()
-        except Exception as e:
-            logger.warning(f"Failed to fetch characters from API in start(): {e}, using cache")
-            CHAR_LIST = load_cached_characters()
-        CHAR_INDEX = {c["id"]: c for c in CHAR_LIST} if CHAR_LIST else {}
-        PROFILE_NAME_TO_ID = {
-            c["name"]: c["id"]
-            for c in CHAR_LIST
-            if "id" in c and "name" in c
-        }
+        await load_characters()
 
     if not CHAR_LIST:
         await cl.Message(content="⚠️ No characters loaded. Please check configuration.").send()
@@ -618,21 +1031,6 @@ async def start():
         char_id = CHAR_LIST[0]["id"]
         logger.warning(f"Profile '{current_profile_name}' not found, using {CHAR_LIST[0]['name']}")
 
-    try:
-        char = await fetch_character_private(char_id)
-        logger.info(f"Fetched full character data for: {char['name']}")
-        logger.info("CHAR UI DEBUG name=%r avatar=%r avatar_url=%r", char.get("name"), char.get("avatar"), char.get("avatar_url"))
-    except Exception as e:
-        logger.error(f"Failed to fetch character details: {e}")
-        await cl.Message(content="⚠️ Failed to load character. Please try again.").send()
-        return
-
-    cl.user_session.set("char", char)
-    cl.user_session.set("char_id", char_id)
-    
-    # Register character avatar for message author
-    await register_character_avatar(char)
-    
     # Resolve user identity (reliable)
     username = cl.user_session.get("auth_username")
     if not username:
@@ -646,7 +1044,31 @@ async def start():
     cl.user_session.set("external_user_id", external_user_id)
     logger.info(f"[IDENT] user={username!r} external_user_id={external_user_id!r}")
     
-    ident = await identity_ensure(external_user_id, username)
+    # Character, identity and model lookups are independent; run them concurrently
+    char, ident, model_names = await asyncio.gather(
+        fetch_character_private(char_id),
+        identity_ensure(external_user_id, username),
+        fetch_models(),
+        return_exceptions=True,
+    )
+
+    if isinstance(char, Exception):
+        logger.error(f"Failed to fetch character details: {char}")
+        await cl.Message(content="⚠️ Failed to load character. Please try again.").send()
+        return
+    logger.info(f"Fetched full character data for: {char['name']}")
+    logger.info("CHAR UI DEBUG name=%r avatar=%r avatar_url=%r", char.get("name"), char.get("avatar"), char.get("avatar_url"))
+
+    cl.user_session.set("char", char)
+    cl.user_session.set("char_id", char_id)
+    cl.user_session.set("author_label", character_display_name(char))
+    
+    # Register character avatar for message author
+    await register_character_avatar(char)
+    
+    if isinstance(ident, Exception):
+        logger.warning(f"Identity ensure failed for {external_user_id}: {ident}")
+        ident = {}
     if not ident:
         ident = {"person_id": f"local:{username or sid}", "preferred_name": username or "there"}
     cl.user_session.set("person_id", ident.get("person_id"))
@@ -660,22 +1082,19 @@ async def start():
         f"Do not ask them what their name is - you already know it.\n\n"
     )
     system_text = (char.get("prompts") or {}).get("system") or ""
-    cl.user_session.set("history", [{"role": "system", "content": identity_hint + system_text}])
+    cl.user_session.set("system_msg", Msg("system", identity_hint + system_text))
+    cl.user_session.set("history", deque(maxlen=HISTORY_TURNS))
     logger.info(f"Chat started with character: {char['name']} for user: {username} (preferred: {preferred_name})")
 
     # Model selection sidebar with error handling
-    try:
-        model_names = await fetch_models()
-        
-        if model_names:
-            default_model = model_names[0]
-            logger.info(f"Found {len(model_names)} models, using {default_model} as default")
-        else:
-            logger.warning("No models available")
-            model_names = ["No models available"]
-            default_model = None
-    except Exception as e:
-        logger.error(f"Failed to fetch models: {e}")
+    if isinstance(model_names, Exception):
+        logger.error(f"Failed to fetch models: {model_names}")
+        model_names = []
+    if model_names:
+        default_model = model_names[0]
+        logger.info(f"Found {len(model_names)} models, using {default_model} as default")
+    else:
+        logger.warning("No models available")
         model_names = ["No models available"]
         default_model = None
 
@@ -699,7 +1118,7 @@ async def start():
         logger.error(f"Failed to send chat settings: {e}")
     
     # Log session start
-    append_event("system", f"session_start character={char_id}")
+    append_event("system", f"session_start character={char_id}", flush=True)
     
     # Send character greeting
     greeting = char.get("greeting")
@@ -715,6 +1134,28 @@ async def update_settings(settings):
     """
     cl.user_session.set("settings", settings)
 
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+_BG_TASKS: set[asyncio.Task] = set()
+
+async def _post_emotion(reply: str):
+    """Classify a reply and post the emotion as a follow-up message.
+    
+    Runs as a background task so the next prompt doesn't wait on the emotion API.
+    
+    :param reply: Assistant reply text to classify
+    :type reply: str
+    """
+    try:
+        emotion_result = await detect_emotion(reply)
+        if emotion_result and emotion_result.get("label"):
+            await cl.Message(
+                content=f"Emotion: {emotion_result['label'].capitalize()} (confidence: {emotion_result['score']:.2f})",
+                disable_human_feedback=True
+            ).send()
+    except Exception as e:
+        # Nothing awaits this task, so log here instead of losing the error
+        logger.warning(f"Emotion post failed: {e}")
+
 @cl.on_message
 async def main(message: cl.Message):
     """Process incoming user messages and generate AI responses.
@@ -725,8 +1166,12 @@ async def main(message: cl.Message):
     :type message: cl.Message
     """
     
+    # Only messages starting with "/" can be commands; plain chat skips the strip
+    content = message.content
+    cmd = content.strip() if content[:1] == "/" else ""
+
     # Debug command: /whoami
-    if message.content.strip().lower() == "/whoami":
+    if cmd.lower() == "/whoami":
         username = cl.user_session.get("auth_username")
         role = cl.user_session.get("auth_role")
         
@@ -749,16 +1194,15 @@ async def main(message: cl.Message):
         return
     
     # Admin command: /admin_users
-    if message.content.strip() == "/admin_users":
+    if cmd == "/admin_users":
         if not await require_admin_or_warn():
             return
         try:
-            async with httpx.AsyncClient(timeout=AUTH_TIMEOUT) as c:
-                r = await c.get(f"{AUTH_API_URL}/auth/admin/users", headers=_admin_headers())
+            r = await auth_client.get(f"{CFG.auth_url}/auth/admin/users", headers=_admin_headers())
             if r.status_code != 200:
                 await cl.Message(content=f"⚠️ Auth API error: {r.status_code} {r.text[:200]}").send()
                 return
-            users = r.json().get("users", [])
+            users = orjson.loads(r.content).get("users", [])
             lines = [f"- {u['username']} ({u['role']}) active={u['is_active']}" for u in users]
             await cl.Message(content="Users:\n" + "\n".join(lines)).send()
         except Exception as e:
@@ -766,81 +1210,77 @@ async def main(message: cl.Message):
         return
     
     # Admin command: /admin_invite [hours]
-    if message.content.strip().startswith("/admin_invite"):
+    if cmd.startswith("/admin_invite"):
         if not await require_admin_or_warn():
             return
-        parts = message.content.split()
+        parts = cmd.split()
         expires = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
         try:
-            async with httpx.AsyncClient(timeout=AUTH_TIMEOUT) as c:
-                r = await c.post(f"{AUTH_API_URL}/auth/admin/invite", json={"expires_hours": expires}, headers=_admin_headers())
+            r = await auth_client.post(f"{CFG.auth_url}/auth/admin/invite", json={"expires_hours": expires}, headers=_admin_headers())
             if r.status_code != 200:
                 await cl.Message(content=f"⚠️ Auth API error: {r.status_code} {r.text[:200]}").send()
                 return
-            code = r.json().get("code")
+            code = orjson.loads(r.content).get("code")
             await cl.Message(content=f"✅ Invite code: `{code}`").send()
         except Exception as e:
             await cl.Message(content=f"⚠️ Error: {str(e)}").send()
         return
     
     # Admin command: /admin_setrole <username> <role>
-    if message.content.strip().startswith("/admin_setrole"):
+    if cmd.startswith("/admin_setrole"):
         if not await require_admin_or_warn():
             return
-        parts = message.content.split()
+        parts = cmd.split()
         if len(parts) != 3:
             await cl.Message(content="Usage: /admin_setrole <username> <admin|user>").send()
             return
         username, role = parts[1], parts[2]
         try:
-            async with httpx.AsyncClient(timeout=AUTH_TIMEOUT) as c:
-                r = await c.post(f"{AUTH_API_URL}/auth/admin/set_role", json={"username": username, "role": role}, headers=_admin_headers())
+            r = await auth_client.post(f"{CFG.auth_url}/auth/admin/set_role", json={"username": username, "role": role}, headers=_admin_headers())
             if r.status_code != 200:
                 await cl.Message(content=f"⚠️ Auth API error: {r.status_code} {r.text[:200]}").send()
                 return
-            msg = r.json().get("message")
+            msg = orjson.loads(r.content).get("message")
             await cl.Message(content=f"✅ {msg}").send()
         except Exception as e:
             await cl.Message(content=f"⚠️ Error: {str(e)}").send()
         return
     
     # Admin command: /admin_disable <username>
-    if message.content.strip().startswith("/admin_disable"):
+    if cmd.startswith("/admin_disable"):
         if not await require_admin_or_warn():
             return
-        parts = message.content.split()
+        parts = cmd.split()
         if len(parts) != 2:
             await cl.Message(content="Usage: /admin_disable <username>").send()
             return
         username = parts[1]
         try:
-            async with httpx.AsyncClient(timeout=AUTH_TIMEOUT) as c:
-                r = await c.post(f"{AUTH_API_URL}/auth/admin/disable", json={"username": username}, headers=_admin_headers())
+            r = await auth_client.post(f"{CFG.auth_url}/auth/admin/disable", json={"username": username}, headers=_admin_headers())
             if r.status_code != 200:
                 await cl.Message(content=f"⚠️ Auth API error: {r.status_code} {r.text[:200]}").send()
                 return
-            msg = r.json().get("message")
+            msg = orjson.loads(r.content).get("message")
             await cl.Message(content=f"✅ {msg}").send()
         except Exception as e:
             await cl.Message(content=f"⚠️ Error: {str(e)}").send()
         return
     
     # Admin command: /admin_enable <username>
-    if message.content.strip().startswith("/admin_enable"):
+    if cmd.startswith("/admin_enable"):
         if not await require_admin_or_warn():
             return
-        parts = message.content.split()
+        parts = cmd.split()
         if len(parts) != 2:
             await cl.Message(content="Usage: /admin_enable <username>").send()
             return
         username = parts[1]
         try:
-            async with httpx.AsyncClient(timeout=AUTH_TIMEOUT) as c:
-                r = await c.post(f"{AUTH_API_URL}/auth/admin/enable", json={"username": username}, headers=_admin_headers())
+            r = await auth_client.post(f"{CFG.auth_url}/auth/admin/enable", json={"username": username}, headers=_admin_headers())
             if r.status_code != 200:
                 await cl.Message(content=f"⚠️ Auth API error: {r.status_code} {r.text[:200]}").send()
                 return
-            msg = r.json().get("message")
+            msg = orjson.loads(r.content).get("message")
             await cl.Message(content=f"✅ {msg}").send()
         except Exception as e:
             await cl.Message(content=f"⚠️ Error: {str(e)}").send()
@@ -860,54 +1300,75 @@ async def main(message: cl.Message):
     default_model = cl.user_session.get("default_model")
     selected_model = settings.get("Model", default_model)
 
-    history = cl.user_session.get("history")
-    if not history:
+    system_msg = cl.user_session.get("system_msg")
+    if system_msg is None:
         preferred_name = cl.user_session.get("preferred_name", "there")
         identity_hint = (
             f"You are chatting with a user whose preferred name is '{preferred_name}'. "
             f"Always address them as '{preferred_name}' unless they explicitly ask otherwise. "
             f"Do not ask them what their name is - you already know it.\n\n"
         )
-        history = [{"role": "system", "content": identity_hint + char.get("prompts", {}).get("system", "")}]
-    history.append({"role": "user", "content": message.content})
-    append_event("user", message.content)
-
-    reply = ""
-    msg = cl.Message(content="", author=character_display_name(char))
+        system_msg = Msg("system", identity_hint + char.get("prompts", {}).get("system", ""))
+        cl.user_session.set("system_msg", system_msg)
+    # The bounded deque drops the oldest turns itself; it is mutated in place
+    history = cl.user_session.get("history")
+    if history is None:
+        history = deque(maxlen=HISTORY_TURNS)
+        cl.user_session.set("history", history)
+    history.append(Msg("user", message.content))
+    # Both turn events share the same session fields
+    meta = event_meta()
+    append_event("user", message.content, meta)
+
+    author_label = cl.user_session.get("author_label") or character_display_name(char)
+    msg = cl.Message(content="", author=author_label)
     await msg.send()
 
+    # Tokens collect in one list: the unsent tail is each WebSocket frame,
+    # and the whole list is joined once into the final reply
+    reply_parts: list[str] = []
+    flushed = 0
+    buf_len = 0
+    last_flush = time.monotonic()
     try:
         logger.info(f"Calling chat API with model: {selected_model}")
-        async for token in stream_chat(selected_model, history):
-            reply += token
-            await msg.stream_token(token)
+        async for token in stream_chat(selected_model, [system_msg, *history]):
+            reply_parts.append(token)
+            buf_len += len(token)
+            now = time.monotonic()
+            if buf_len >= CFG.stream_buf_chars or now - last_flush > STREAM_FLUSH_INTERVAL:
+                await msg.stream_token("".join(reply_parts[flushed:]))
+                flushed = len(reply_parts)
+                buf_len = 0
+                last_flush = now
+        reply = "".join(reply_parts)
     except Exception as e:
         logger.error(f"Chat API error: {e}")
         reply = f"⚠️ Chat API error: {str(e)}"
-        await msg.stream_token(reply)
+        reply_parts.append(reply)
+    if flushed < len(reply_parts):
+        await msg.stream_token("".join(reply_parts[flushed:]))
 
     await msg.update()
 
-    # Emotion detection with error handling
-    if reply.strip() and EMOTION_ENABLED:
-        emotion_result = await detect_emotion(reply)
-        if emotion_result and emotion_result.get("label"):
-            await cl.Message(
-                content=f"Emotion: {emotion_result['label'].capitalize()} (confidence: {emotion_result['score']:.2f})",
-                disable_human_feedback=True
-            ).send()
+    # Emotion detection runs in the background; the bubble arrives when it's ready
+    if CFG.emotion_enabled and should_classify(reply.strip()):
+        task = asyncio.create_task(_post_emotion(reply))
+        _BG_TASKS.add(task)
+        task.add_done_callback(_BG_TASKS.discard)
 
-    history.append({"role": "assistant", "content": reply})
-    cl.user_session.set("history", history)
-    append_event("assistant", reply)
+    history.append(Msg("assistant", reply))
+    # End of turn: flush so the log is readable (and survives a crash) mid-session
+    append_event("assistant", reply, meta, flush=True)
 
 @cl.on_chat_end
 async def on_chat_end():
     """Clean up resources when chat session ends.
     
-    Logs session end event for persistent conversation tracking.
+    Logs session end event and closes the session log handle.
     """
     append_event("system", "session_end")
+    _EVENT_EXECUTOR.submit(close_event_logs, session_id())
 
 @cl.action_callback("heartbeat")
 async def heartbeat():
@@ -920,11 +1381,55 @@ async def heartbeat():
 
 # Shutdown hook for clean container stop
 import atexit
-import asyncio
 import signal
 
+async def warm_chat_connection():
+    """Open a pooled connection to the chat backend ahead of the first message.
+    
+    Any response keeps the connection alive in the pool, so the status is ignored.
+    """
+    if not CFG.chat_url:
+        return
+    try:
+        await chat_client.head(CFG.chat_url, headers=_CHAT_HEADERS_BASE, timeout=make_timeout(5))
+    except Exception as e:
+        logger.warning(f"Chat API warm-up failed: {e}")
+
+async def warm_character_cache():
+    """Load the character list and prefetch every character's private data."""
+    chars = await load_characters()
+    if not CFG.char_url:
+        return
+    results = await asyncio.gather(
+        *(fetch_character_private(c["id"]) for c in chars if "id" in c),
+        return_exceptions=True,
+    )
+    failed = sum(isinstance(r, Exception) for r in results)
+    logger.info(f"Warmed character cache: {len(results) - failed} loaded, {failed} failed")
+
+@cl.on_app_startup
+async def on_app_startup():
+    """Warm caches and upstream connections before the first user connects.
+    
+    Fills the character and model caches and opens the chat backend connection,
+    so the first chat on a fresh worker doesn't pay for them.
+    """
+    await asyncio.gather(warm_character_cache(), fetch_models(), warm_chat_connection())
+
+@cl.on_app_shutdown
+async def on_app_shutdown():
+    """Stop the emotion batch worker and close pooled HTTP clients and session logs."""
+    if _emotion_worker is not None and not _emotion_worker.done():
+        _emotion_worker.cancel()
+        try:
+            await _emotion_worker
+        except asyncio.CancelledError:
+            pass
+    await asyncio.get_running_loop().run_in_executor(_EVENT_EXECUTOR, close_event_logs)
+    await close_http_clients()
+
 def _close_httpx_sync():
-    """Best-effort close for the global AsyncClient on interpreter exit."""
+    """Best-effort close for the pooled AsyncClients on interpreter exit."""
     try:
         loop = asyncio.get_event_loop()
     except Exception:
@@ -933,20 +1438,22 @@ def _close_httpx_sync():
     if loop and loop.is_running():
         # Schedule and hope the loop still runs long enough
         try:
-            loop.create_task(client.aclose())
+            loop.create_task(close_http_clients())
         except Exception:
             pass
         return
 
     # No running loop: create one just to close
     try:
-        asyncio.run(client.aclose())
+        asyncio.run(close_http_clients())
     except Exception:
         pass
 
 def _handle_sigterm(*_):
+    _EVENT_EXECUTOR.submit(close_event_logs)
     _close_httpx_sync()
 
 signal.signal(signal.SIGTERM, _handle_sigterm)
 signal.signal(signal.SIGINT, _handle_sigterm)
 atexit.register(_close_httpx_sync)
+atexit.register(close_event_logs)
@@ -1,7 +1,10 @@
 """Auth API for user registration and management."""
 
+import hmac
 import os
-from fastapi import FastAPI, HTTPException, Header
+import threading
+import time
+from fastapi import Depends, FastAPI, HTTPException, Header, Request
 from pydantic import BaseModel
 from users import create_user, disable_user, enable_user, create_invite, list_users, verify_user, set_role
 from users import init_db
@@ -16,14 +19,51 @@ REGISTRATION_ENABLED = os.getenv("REGISTRATION_ENABLED", "1") == "1"
 REGISTRATION_REQUIRE_INVITE = os.getenv("REGISTRATION_REQUIRE_INVITE", "1") == "1"
 USER_ADMIN_API_KEY = os.getenv("USER_ADMIN_API_KEY", "")
 
-def verify_admin(x_admin_key: str = Header(None)):
+# Token bucket for admin routes, per client IP: refill rate (tokens/s) and burst size
+ADMIN_RATE = 10.0
+ADMIN_BURST = 20.0
+ADMIN_BUCKETS_MAX = 10000
+_admin_buckets: dict[str, tuple[float, float]] = {}
+_admin_buckets_lock = threading.Lock()
+
+def admin_rate_ok(client_ip: str) -> bool:
+    """Take one token from the client's admin bucket.
+    
+    :param client_ip: Client address the bucket is keyed by
+    :type client_ip: str
+    :return: True if the request is within the rate limit
+    :rtype: bool
+    """
+    now = time.monotonic()
+    with _admin_buckets_lock:
+        tokens, last = _admin_buckets.get(client_ip, (ADMIN_BURST, now))
+        tokens = min(ADMIN_BURST, tokens + (now - last) * ADMIN_RATE)
+        if tokens < 1:
+            _admin_buckets[client_ip] = (tokens, now)
+            return False
+        if len(_admin_buckets) > ADMIN_BUCKETS_MAX:
+            # Buckets idle long enough to have refilled are equivalent to new ones
+            stale = now - ADMIN_BURST / ADMIN_RATE
+            for ip in [ip for ip, (_, seen) in _admin_buckets.items() if seen < stale]:
+                del _admin_buckets[ip]
+        _admin_buckets[client_ip] = (tokens - 1, now)
+        return True
+
+def verify_admin(request: Request, x_admin_key: str = Header(None)):
     """Verify admin API key.
     
+    Used as a route dependency, so bad keys are rejected before the handler runs.
+    Requests are rate limited per client IP before the key is checked.
+    
+    :param request: Incoming request, used for the client address
+    :type request: Request
     :param x_admin_key: Admin API key from x-admin-key header
     :type x_admin_key: str
-    :raises HTTPException: 403 if key is invalid or missing
+    :raises HTTPException: 429 if rate limited, 403 if key is invalid or missing
     """
-    if not USER_ADMIN_API_KEY or x_admin_key != USER_ADMIN_API_KEY:
+    if not admin_rate_ok(request.client.host if request.client else ""):
+        raise HTTPException(status_code=429, detail="Too many requests")
+    if not USER_ADMIN_API_KEY or not hmac.compare_digest((x_admin_key or "").encode(), USER_ADMIN_API_KEY.encode()):
         raise HTTPException(status_code=403, detail="Invalid admin key")
 
 class LoginRequest(BaseModel):
@@ -48,8 +88,36 @@ class SetRoleRequest(BaseModel):
 class CreateInviteRequest(BaseModel):
     expires_hours: int = None
 
-@app.get("/health")
-def health():
+# Response models let FastAPI serialize straight to JSON bytes via Pydantic
+class HealthResponse(BaseModel):
+    ok: bool
+    service: str
+
+class LoginResponse(BaseModel):
+    ok: bool
+    role: str
+
+class MessageResponse(BaseModel):
+    ok: bool
+    message: str
+
+class InviteResponse(BaseModel):
+    ok: bool
+    code: str
+
+class UserInfo(BaseModel):
+    username: str
+    role: str
+    is_active: int
+    created_at: str
+    last_login_at: str | None = None
+
+class UsersResponse(BaseModel):
+    ok: bool
+    users: list[UserInfo]
+
+@app.get("/health", response_model=HealthResponse)
+async def health():
     """Health check endpoint.
     
     :return: Status dictionary
@@ -57,7 +125,7 @@ def health():
     """
     return {"ok": True, "service": "auth_api"}
 
-@app.post("/auth/login")
+@app.post("/auth/login", response_model=LoginResponse)
 def login(req: LoginRequest):
     """Verify user credentials.
     
@@ -72,7 +140,7 @@ def login(req: LoginRequest):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return {"ok": True, "role": role}
 
-@app.post("/auth/register")
+@app.post("/auth/register", response_model=MessageResponse)
 def register(req: RegisterRequest):
     """Register new user.
     
@@ -102,92 +170,72 @@ def register(req: RegisterRequest):
     
     return {"ok": True, "message": message}
 
-@app.post("/auth/admin/disable")
-def admin_disable(req: DisableUserRequest, _admin=Header(default=None, alias="x-admin-key")):
+@app.post("/auth/admin/disable", response_model=MessageResponse, dependencies=[Depends(verify_admin)])
+def admin_disable(req: DisableUserRequest):
     """Disable user (admin only).
     
     :param req: Request with username to disable
     :type req: DisableUserRequest
-    :param _admin: Admin API key from header
-    :type _admin: str
     :return: Success response
     :rtype: dict
     :raises HTTPException: 403 if not admin, 404 if user not found
     """
-    verify_admin(_admin)
-    
     success, message = disable_user(req.username)
     if not success:
         raise HTTPException(status_code=404, detail=message)
     
     return {"ok": True, "message": message}
 
-@app.post("/auth/admin/enable")
-def admin_enable(req: EnableUserRequest, _admin=Header(default=None, alias="x-admin-key")):
+@app.post("/auth/admin/enable", response_model=MessageResponse, dependencies=[Depends(verify_admin)])
+def admin_enable(req: EnableUserRequest):
     """Enable user (admin only).
     
     :param req: Request with username to enable
     :type req: EnableUserRequest
-    :param _admin: Admin API key from header
-    :type _admin: str
     :return: Success response
     :rtype: dict
     :raises HTTPException: 403 if not admin, 404 if user not found
     """
-    verify_admin(_admin)
-    
     success, message = enable_user(req.username)
     if not success:
         raise HTTPException(status_code=404, detail=message)
     
     return {"ok": True, "message": message}
 
-@app.post("/auth/admin/invite")
-def admin_invite(req: CreateInviteRequest, _admin=Header(default=None, alias="x-admin-key")):
+@app.post("/auth/admin/invite", response_model=InviteResponse, dependencies=[Depends(verify_admin)])
+def admin_invite(req: CreateInviteRequest):
     """Create invite code (admin only).
     
     :param req: Request with optional expires_hours
     :type req: CreateInviteRequest
-    :param _admin: Admin API key from header
-    :type _admin: str
     :return: Response with generated invite code
     :rtype: dict
     :raises HTTPException: 403 if not admin
     """
-    verify_admin(_admin)
-    
     code = create_invite(req.expires_hours)
     return {"ok": True, "code": code}
 
-@app.get("/auth/admin/users")
-def admin_list_users(_admin: str = Header(None, alias="x-admin-key")):
+@app.get("/auth/admin/users", response_model=UsersResponse, dependencies=[Depends(verify_admin)])
+def admin_list_users():
     """List all users (admin only).
     
-    :param _admin: Admin API key from header
-    :type _admin: str
     :return: Response with list of users
     :rtype: dict
     :raises HTTPException: 403 if not admin
     """
-    verify_admin(_admin)
-    
     users = list_users()
     return {"ok": True, "users": users}
 
-@app.post("/auth/admin/set_role")
-def admin_set_role(req: SetRoleRequest, _admin: str = Header(None, alias="x-admin-key")):
+@app.post("/auth/admin/set_role", response_model=MessageResponse, dependencies=[Depends(verify_admin)])
+def admin_set_role(req: SetRoleRequest):
     """Set user role (admin only).
     
     :param req: Request with username and role
     :type req: SetRoleRequest
-    :param _admin: Admin API key from header
-    :type _admin: str
     :return: Success response
     :rtype: dict
     :raises HTTPException: 403 if not admin, 400 if invalid role, 404 if user not found
     """
-    verify_admin(_admin)
-    
     success, message = set_role(req.username, req.role)
     if not success:
         raise HTTPException(status_code=400 if "must be" in message else 404, detail=message)
@@ -4,14 +4,38 @@ Tests application structure, dependencies, and configuration.
 """
 
 import pytest
-import json
+import re
 from pathlib import Path
 import sys
-import os
 
 # Get repo root
 REPO_ROOT = Path(__file__).parent.parent
-os.chdir(REPO_ROOT)
+WORKFLOW = REPO_ROOT / ".github" / "workflows" / "test.yml"
+GITIGNORE = REPO_ROOT / ".gitignore"
+ENV_TEMPLATE = REPO_ROOT / ".env.template"
+CHAINLIT_CONFIG = REPO_ROOT / ".chainlit" / "config.toml"
+
+REQUIRED_ENV_VARS = frozenset({
+    # Required API endpoints
+    "CHAT_API_URL", "MODELS_API_URL", "CHAR_API_URL", "CHAR_API_KEY",
+    "IDENTITY_API_URL", "IDENTITY_API_KEY",
+    # Authentication
+    "CHAINLIT_AUTH_SECRET", "USER_DB_PATH", "USER_ADMIN_API_KEY",
+    "REGISTRATION_ENABLED", "REGISTRATION_REQUIRE_INVITE",
+})
+
+REQUIRED_DEPENDENCIES = frozenset({
+    "chainlit", "httpx", "python-dotenv", "fastapi", "uvicorn", "passlib", "bcrypt",
+})
+
+# Services, ports, volumes and container names expected in docker-compose.yaml
+COMPOSE_ENTRIES = (
+    "webbui_chat:", "webbui_auth_api:", "wakeup_helper:", "wakeup_proxy:",
+    "8000:8000", "8001:8001", "7999:80",
+    "./state:/state",
+    "cathyai_webbui_chat", "cathyai_webbui_auth_api",
+    "cathyai_wakeup_helper", "cathyai_wakeup_proxy",
+)
 
 
 class TestAppStructure:
@@ -29,50 +53,25 @@ class TestAppStructure:
         assert (REPO_ROOT / "docker-compose.yaml").exists(), "docker-compose.yaml not found"
         assert (REPO_ROOT / "requirements.txt").exists(), "requirements.txt not found"
 
-    def test_env_template_exists(self):
+    def test_env_template_exists(self, repo_files):
         """Test that .env.template exists with required variables."""
-        env_template = REPO_ROOT / ".env.template"
-        assert env_template.exists(), ".env.template not found"
-        content = env_template.read_text()
-        
-        # Required API endpoints
-        assert "CHAT_API_URL=" in content, ".env.template missing CHAT_API_URL"
-        assert "MODELS_API_URL=" in content, ".env.template missing MODELS_API_URL"
-        assert "CHAR_API_URL=" in content, ".env.template missing CHAR_API_URL"
-        assert "CHAR_API_KEY=" in content, ".env.template missing CHAR_API_KEY"
-        assert "IDENTITY_API_URL=" in content, ".env.template missing IDENTITY_API_URL"
-        assert "IDENTITY_API_KEY=" in content, ".env.template missing IDENTITY_API_KEY"
-        
-        # Authentication
-        assert "CHAINLIT_AUTH_SECRET=" in content, ".env.template missing CHAINLIT_AUTH_SECRET"
-        assert "USER_DB_PATH=" in content, ".env.template missing USER_DB_PATH"
-        assert "USER_ADMIN_API_KEY=" in content, ".env.template missing USER_ADMIN_API_KEY"
-        assert "REGISTRATION_ENABLED=" in content, ".env.template missing REGISTRATION_ENABLED"
-        assert "REGISTRATION_REQUIRE_INVITE=" in content, ".env.template missing REGISTRATION_REQUIRE_INVITE"
-
-    def test_requirements_has_dependencies(self):
+        assert ENV_TEMPLATE.exists(), ".env.template not found"
+        content = repo_files(".env.template")
+        defined = set(re.findall(r"^\s*#?\s*([A-Z][A-Z0-9_]*)=", content, re.MULTILINE))
+        missing = REQUIRED_ENV_VARS - defined
+        assert not missing, f".env.template missing {sorted(missing)}"
+
+    def test_requirements_has_dependencies(self, repo_files):
         """Test that requirements.txt has necessary dependencies."""
-        content = (REPO_ROOT / "requirements.txt").read_text()
-        required = ["chainlit", "httpx", "python-dotenv", "fastapi", "uvicorn", "passlib", "bcrypt"]
-        
-        for dep in required:
-            assert dep in content, f"Missing dependency: {dep}"
+        content = repo_files("requirements.txt")
+        missing = {dep for dep in REQUIRED_DEPENDENCIES if dep not in content}
+        assert not missing, f"Missing dependencies: {sorted(missing)}"
 
-    def test_docker_compose_structure(self):
+    @pytest.mark.parametrize("expected", COMPOSE_ENTRIES, ids=COMPOSE_ENTRIES)
+    def test_docker_compose_structure(self, repo_files, expected):
         """Test that docker-compose.yaml has proper structure."""
-        compose = (REPO_ROOT / "docker-compose.yaml").read_text()
-        assert "webbui_chat:" in compose, "docker-compose.yaml missing webbui_chat service"
-        assert "webbui_auth_api:" in compose, "docker-compose.yaml missing webbui_auth_api service"
-        assert "wakeup_helper:" in compose, "docker-compose.yaml missing wakeup_helper service"
-        assert "wakeup_proxy:" in compose, "docker-compose.yaml missing wakeup_proxy service"
-        assert "8000:8000" in compose, "docker-compose.yaml missing port 8000"
-        assert "8001:8001" in compose, "docker-compose.yaml missing port 8001"
-        assert "7999:80" in compose, "docker-compose.yaml missing port 7999"
-        assert "./state:/state" in compose, "docker-compose.yaml missing state volume"
-        assert "cathyai_webbui_chat" in compose, "docker-compose.yaml missing container name"
-        assert "cathyai_webbui_auth_api" in compose, "docker-compose.yaml missing container name"
-        assert "cathyai_wakeup_helper" in compose, "docker-compose.yaml missing container name"
-        assert "cathyai_wakeup_proxy" in compose, "docker-compose.yaml missing container name"
+        compose = repo_files("docker-compose.yaml")
+        assert expected in compose, f"docker-compose.yaml missing {expected}"
 
     def test_setup_scripts_exist(self):
         """Test that setup scripts exist."""
@@ -81,20 +80,18 @@ class TestAppStructure:
         assert (REPO_ROOT / "generate_secrets.py").exists(), "generate_secrets.py not found"
         assert (REPO_ROOT / "bootstrap_admin.py").exists(), "bootstrap_admin.py not found"
 
-    def test_github_workflow_exists(self):
+    def test_github_workflow_exists(self, repo_files):
         """Test that GitHub Actions workflow exists."""
-        workflow = REPO_ROOT / ".github" / "workflows" / "test.yml"
-        assert workflow.exists(), "GitHub Actions workflow not found"
-        content = workflow.read_text()
-        assert "pytest" in content, "Workflow missing pytest"
-        assert "dmz" in content, "Workflow missing dmz branch reference"
-        assert "merge" in content.lower(), "Workflow missing merge job"
-
-    def test_gitignore_has_python_patterns(self):
+        assert WORKFLOW.exists(), "GitHub Actions workflow not found"
+        content = repo_files(".github/workflows/test.yml")
+        found = {m.lower() for m in re.findall(r"pytest|dmz|(?i:merge)", content)}
+        missing = {"pytest", "dmz", "merge"} - found
+        assert not missing, f"Workflow missing {sorted(missing)}"
+
+    def test_gitignore_has_python_patterns(self, repo_files):
         """Test that .gitignore ignores Python cache files."""
-        gitignore = REPO_ROOT / ".gitignore"
-        assert gitignore.exists(), ".gitignore not found"
-        content = gitignore.read_text()
+        assert GITIGNORE.exists(), ".gitignore not found"
+        content = repo_files(".gitignore")
         assert "__pycache__" in content, ".gitignore missing __pycache__"
         assert ".pytest_cache" in content, ".gitignore missing .pytest_cache"
         assert ".env" in content, ".gitignore missing .env"
@@ -105,5 +102,5 @@ class TestAppStructure:
 
     def test_chainlit_config_exists(self):
         """Test that Chainlit configuration exists."""
-        assert (REPO_ROOT / ".chainlit" / "config.toml").exists(), "Chainlit config.toml not found"
+        assert CHAINLIT_CONFIG.exists(), "Chainlit config.toml not found"
         assert (REPO_ROOT / "chainlit.md").exists(), "chainlit.md not found"
\ No newline at end of file
@@ -14,45 +14,6 @@ from pathlib import Path
 REPO_ROOT = Path(__file__).parent.parent
 
 
-class TestAuthModules:
-    """Test suite for authentication module existence and structure."""
-    
-    def test_auth_modules_exist(self):
-        """Test that authentication modules exist."""
-        users_py = REPO_ROOT / "users.py"
-        auth_api_py = REPO_ROOT / "auth_api.py"
-        bootstrap_py = REPO_ROOT / "bootstrap_admin.py"
-        
-        assert users_py.exists(), "users.py not found"
-        assert auth_api_py.exists(), "auth_api.py not found"
-        assert bootstrap_py.exists(), "bootstrap_admin.py not found"
-    
-    def test_user_management_docs_exist(self):
-        """Test that user management documentation exists."""
-        user_mgmt_doc = REPO_ROOT / "USER_MANAGEMENT.md"
-        assert user_mgmt_doc.exists(), "USER_MANAGEMENT.md not found"
-    
-    def test_auth_dependencies_in_requirements(self):
-        """Test that auth dependencies are in requirements.txt."""
-        requirements = REPO_ROOT / "requirements.txt"
-        content = requirements.read_text()
-        
-        assert "fastapi" in content, "fastapi not in requirements.txt"
-        assert "uvicorn" in content, "uvicorn not in requirements.txt"
-        assert "passlib" in content, "passlib not in requirements.txt"
-    
-    def test_auth_env_vars_in_template(self):
-        """Test that auth environment variables are in template."""
-        env_template = REPO_ROOT / ".env.template"
-        content = env_template.read_text()
-        
-        assert "CHAINLIT_AUTH_SECRET" in content, "CHAINLIT_AUTH_SECRET not in .env.template"
-        assert "USER_DB_PATH" in content, "USER_DB_PATH not in .env.template"
-        assert "USER_ADMIN_API_KEY" in content, "USER_ADMIN_API_KEY not in .env.template"
-        assert "REGISTRATION_ENABLED" in content, "REGISTRATION_ENABLED not in .env.template"
-        assert "REGISTRATION_REQUIRE_INVITE" in content, "REGISTRATION_REQUIRE_INVITE not in .env.template"
-
-
 class TestUserAuthentication:
     """Test suite for user authentication functionality."""
     
@@ -63,6 +24,8 @@ class TestUserAuthentication:
         self.test_db = tempfile.NamedTemporaryFile(delete=False, suffix='.sqlite')
         self.test_db.close()
         os.environ['USER_DB_PATH'] = self.test_db.name
+        # Minimum bcrypt cost keeps hashing cheap in tests
+        os.environ['BCRYPT_ROUNDS'] = '4'
         
         # Import after setting env var
         import sys
@@ -83,6 +46,17 @@ class TestUserAuthentication:
         except:
             pass
     
+    @pytest.fixture
+    def test_user(self):
+        """Create the default ``testuser`` account with role ``user``.
+        
+        :return: Tuple of (username, password)
+        :rtype: tuple[str, str]
+        """
+        from users import create_user
+        create_user("testuser", "password123")
+        return "testuser", "password123"
+    
     def test_create_user_without_invite(self):
         """Test creating user without invite code."""
         from users import create_user
@@ -106,10 +80,9 @@ class TestUserAuthentication:
         assert success is True
         assert role == "admin"
     
-    def test_verify_user_wrong_password(self):
+    def test_verify_user_wrong_password(self, test_user):
         """Test user verification with wrong password."""
-        from users import create_user, verify_user
-        create_user("testuser", "password123")
+        from users import verify_user
         success, role = verify_user("testuser", "wrong_password")
         assert success is False
         assert role == ""
@@ -121,10 +94,9 @@ class TestUserAuthentication:
         assert success is False
         assert role == ""
     
-    def test_disable_user(self):
+    def test_disable_user(self, test_user):
         """Test disabling a user account."""
-        from users import create_user, verify_user, disable_user
-        create_user("testuser", "password123")
+        from users import verify_user, disable_user
         
         # Verify user can login before disable
         success, _ = verify_user("testuser", "password123")
@@ -139,10 +111,9 @@ class TestUserAuthentication:
         success, _ = verify_user("testuser", "password123")
         assert success is False
     
-    def test_enable_user(self):
+    def test_enable_user(self, test_user):
         """Test re-enabling a disabled user account."""
-        from users import create_user, verify_user, disable_user, enable_user
-        create_user("testuser", "password123")
+        from users import verify_user, disable_user, enable_user
         disable_user("testuser")
         
         # Enable user
@@ -202,7 +173,8 @@ class TestUserAuthentication:
         # Second use should fail
         success, message = create_user("user2", "password123", invite_code=invite_code)
         assert success is False
-        assert "used" in message.lower() or "invalid" in message.lower()
+        message = message.lower()
+        assert "used" in message or "invalid" in message
     
     def test_list_users(self):
         """Test listing all users."""
@@ -227,11 +199,8 @@ class TestUserAuthentication:
         success, role = verify_user("regular_user", "password")
         assert role == "user"
     
-    def test_password_hashing(self):
+    def test_password_hashing(self, test_user):
         """Test that passwords are hashed, not stored in plaintext."""
-        from users import create_user
-        create_user("testuser", "password123")
-        
         # Check database directly
         conn = sqlite3.connect(self.test_db.name)
         cursor = conn.execute("SELECT pw_hash FROM users WHERE username = ?", ("testuser",))
@@ -243,10 +212,9 @@ class TestUserAuthentication:
         # Hash should be bcrypt format
         assert pw_hash.startswith("$2b$")
     
-    def test_last_login_tracking(self):
+    def test_last_login_tracking(self, test_user):
         """Test that last login timestamp is updated."""
-        from users import create_user, verify_user
-        create_user("testuser", "password123")
+        from users import verify_user
         
         # First login
         verify_user("testuser", "password123")
@@ -275,3 +243,82 @@ class TestUserAuthentication:
         assert user['username'] == 'testuser'
         assert user['role'] == 'admin'
         assert user['is_active'] == 1
+
+
+class TestAdminAPI:
+    """Test suite for admin route authentication and rate limiting."""
+    
+    ADMIN_KEY = "test-admin-key"
+    
+    @pytest.fixture(autouse=True)
+    def setup_teardown(self, tmp_path, monkeypatch):
+        """Import auth_api against a temp database with a known admin key."""
+        import sys
+        from fastapi.testclient import TestClient
+        
+        monkeypatch.setenv('USER_DB_PATH', str(tmp_path / 'users.sqlite'))
+        monkeypatch.setenv('BCRYPT_ROUNDS', '4')
+        monkeypatch.delenv('BOOTSTRAP_ADMIN_USERNAME', raising=False)
+        monkeypatch.syspath_prepend(str(REPO_ROOT))
+        # users reads USER_DB_PATH at import, so reload the whole chain
+        for mod in ('users', 'bootstrap_admin', 'auth_api'):
+            sys.modules.pop(mod, None)
+        
+        import auth_api
+        monkeypatch.setattr(auth_api, 'USER_ADMIN_API_KEY', self.ADMIN_KEY)
+        monkeypatch.setattr(auth_api, '_admin_buckets', {})
+        self.auth_api = auth_api
+        self.client = TestClient(auth_api.app)
+        
+        yield
+        
+        for mod in ('users', 'bootstrap_admin', 'auth_api'):
+            sys.modules.pop(mod, None)
+    
+    def test_valid_admin_key(self):
+        """Test that a valid admin key is accepted."""
+        resp = self.client.get("/auth/admin/users", headers={"x-admin-key": self.ADMIN_KEY})
+        assert resp.status_code == 200
+        assert resp.json() == {"ok": True, "users": []}
+    
+    @pytest.mark.parametrize("headers", [{"x-admin-key": "wrong"}, {}], ids=["wrong-key", "missing-key"])
+    def test_invalid_admin_key(self, headers):
+        """Test that a wrong or missing admin key is rejected."""
+        resp = self.client.get("/auth/admin/users", headers=headers)
+        assert resp.status_code == 403
+    
+    def test_bad_key_rejected_before_body_validation(self):
+        """Test that the key check runs before the request body is validated."""
+        resp = self.client.post("/auth/admin/disable", json={}, headers={"x-admin-key": "wrong"})
+        assert resp.status_code == 403
+        
+        resp = self.client.post("/auth/admin/disable", json={}, headers={"x-admin-key": self.ADMIN_KEY})
+        assert resp.status_code == 422
+    
+    def test_admin_rate_limit(self, monkeypatch):
+        """Test that requests beyond the burst size are rate limited."""
+        # Negligible refill so the burst isn't topped up while the test runs
+        monkeypatch.setattr(self.auth_api, 'ADMIN_RATE', 0.001)
+        headers = {"x-admin-key": self.ADMIN_KEY}
+        for _ in range(int(self.auth_api.ADMIN_BURST)):
+            assert self.client.get("/auth/admin/users", headers=headers).status_code == 200
+        
+        resp = self.client.get("/auth/admin/users", headers=headers)
+        assert resp.status_code == 429
+    
+    def test_bucket_eviction_keeps_active_clients(self, monkeypatch):
+        """Test that only idle buckets are evicted when the table is full."""
+        import time
+        monkeypatch.setattr(self.auth_api, 'ADMIN_BUCKETS_MAX', 10)
+        buckets = self.auth_api._admin_buckets
+        now = time.monotonic()
+        for i in range(10):
+            buckets[f"idle{i}"] = (self.auth_api.ADMIN_BURST, now - 3600)
+        buckets["abuser"] = (0.0, now)
+        
+        assert self.auth_api.admin_rate_ok("abuser") is False
+        assert self.auth_api.admin_rate_ok("newcomer") is True
+        
+        assert "abuser" in buckets
+        assert not any(ip.startswith("idle") for ip in buckets)
+        assert self.auth_api.admin_rate_ok("abuser") is False
@@ -3,40 +3,61 @@
 Tests chat UI, character loading, and API integration.
 """
 
+import asyncio
+import dataclasses
+import httpx
+import orjson
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import Mock
 import sys
-import os
 
 REPO_ROOT = Path(__file__).parent.parent
 
 
+@pytest.fixture(scope="module")
+def app_module():
+    """Import app.py once per module with chainlit replaced by a Mock."""
+    original_modules = set(sys.modules.keys())
+    with pytest.MonkeyPatch.context() as mp:
+        mp.syspath_prepend(str(REPO_ROOT))
+        mp.setitem(sys.modules, 'chainlit', Mock())
+        import app
+        yield app
+    # Drop app (and anything it pulled in under that name) so later imports start clean
+    for mod in set(sys.modules.keys()) - original_modules:
+        if mod.startswith('app'):
+            sys.modules.pop(mod, None)
+
+
+def make_stream_client(chunks: list[bytes]) -> httpx.AsyncClient:
+    """Build a client whose responses stream ``chunks`` as separate body reads.
+
+    :param chunks: Raw byte chunks of the response body
+    :type chunks: list[bytes]
+    :return: Client backed by a mock transport
+    :rtype: httpx.AsyncClient
+    """
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body())))
+
+
+def ndjson(contents: list[str]) -> list[bytes]:
+    """Encode message contents as Ollama NDJSON lines, one chunk per line."""
+    return [orjson.dumps({"message": {"content": c}, "done": False}) + b"\n" for c in contents]
+
+
 class TestWebbuiChat:
     """Test suite for Chainlit chat application."""
     
     @pytest.fixture(autouse=True)
-    def setup_teardown(self, monkeypatch):
-        """Setup and teardown for each test to ensure clean imports."""
-        # Setup
-        original_path = sys.path.copy()
-        original_modules = set(sys.modules.keys())
-        
-        os.chdir(REPO_ROOT)
-        sys.path.insert(0, str(REPO_ROOT))
-        sys.modules['chainlit'] = Mock()
-        
-        import app
-        self.app = app
-        
-        yield
-        
-        # Teardown
-        sys.path = original_path
-        new_modules = set(sys.modules.keys()) - original_modules
-        for mod in new_modules:
-            if mod.startswith('app') or mod == 'chainlit':
-                sys.modules.pop(mod, None)
+    def bind_app(self, app_module):
+        """Expose the shared app module to each test."""
+        self.app = app_module
 
     def test_app_imports(self):
         """Test that app.py can be imported without errors."""
@@ -102,3 +123,525 @@ class TestWebbuiChat:
     def test_authentication_callback(self):
         """Test that authentication callback exists."""
         assert callable(self.app.auth_callback), "auth_callback should be callable"
+
+
+class TestStreamChat:
+    """Behaviour tests for streamed chat parsing."""
+
+    @pytest.fixture(autouse=True)
+    def bind_app(self, app_module, monkeypatch):
+        """Point the app at a fake chat URL."""
+        self.app = app_module
+        self.monkeypatch = monkeypatch
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(app_module.CFG, chat_url="http://chat.test/api/chat"))
+
+    def stream(self, chunks: list[bytes]) -> str:
+        """Run stream_chat against ``chunks`` and join the yielded tokens."""
+        async def run():
+            client = make_stream_client(chunks)
+            self.monkeypatch.setattr(self.app, "chat_client", client)
+            try:
+                return "".join([t async for t in self.app.stream_chat("m", [])])
+            finally:
+                await client.aclose()
+        return asyncio.run(run())
+
+    @pytest.mark.parametrize("contents", [
+        ["Hel", "lo", " there"],
+        ["*", "**bold", "** yes"],
+        ["\n", "\n\nHi", " there"],
+        ["ha", "ha", "ha", " funny"],
+        ["I", "I'm", " fine"],
+        ["a", "ab", "c", "d"],
+        ["Hi", "Hi there"],
+    ], ids=["plain", "prefix-token", "newline-prefix", "repeated-token", "short-prefix", "extends-once", "short-run-at-end"])
+    def test_delta_stream(self, contents):
+        """Delta tokens are passed through, even when one extends the previous."""
+        assert self.stream(ndjson(contents)) == "".join(contents)
+
+    @pytest.mark.parametrize("contents", [
+        ["Hi", "Hi there", "Hi there!", "Hi there! How", "Hi there! How are you?"],
+        ["Hi", "Hi there", "Hi there!", "Hi there! How", "Hi there! How", "Hi there! How are you?"],
+    ], ids=["growing", "repeats"])
+    def test_cumulative_stream(self, contents):
+        """Cumulative content yields only the new suffix each time."""
+        assert self.stream(ndjson(contents)) == "Hi there! How are you?"
+
+    def test_cumulative_then_delta(self):
+        """A chunk that stops extending the reply is emitted whole, not cut."""
+        contents = ["Hi", "Hi there", "Hi there!", "Hi there! How", " are you?"]
+        assert self.stream(ndjson(contents)) == "Hi there! How are you?"
+
+    def test_sse_data_lines_and_done(self):
+        """SSE ``data:`` prefixes are stripped and ``[DONE]`` ends the stream."""
+        chunks = [b"data: " + line for line in ndjson(["Hi", " you"])]
+        chunks += [b"data: [DONE]\n", *ndjson([" ignored"])]
+        assert self.stream(chunks) == "Hi you"
+
+    def test_lines_split_across_chunks(self):
+        """A JSON line split over several body reads is reassembled."""
+        body = b"".join(ndjson(["Hel", "lo"])) + orjson.dumps({"message": {"content": "!"}})
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+        assert self.stream(chunks) == "Hello!"
+
+    def test_aiter_byte_lines(self):
+        """Byte lines are split on newlines, stripped, and blank lines dropped."""
+        async def run():
+            client = make_stream_client([b"a\r\n\n b", b"c\n", b"d"])
+            try:
+                async with client.stream("GET", "http://chat.test/") as response:
+                    return [line async for line in self.app.aiter_byte_lines(response)]
+            finally:
+                await client.aclose()
+        assert asyncio.run(run()) == [b"a", b"bc", b"d"]
+
+
+class FakeClock:
+    """Stand-in for the app's ``time`` module with a manually advanced clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+class TestCharacterPrivateCache:
+    """Behaviour tests for the private character TTL cache."""
+
+    @pytest.fixture(autouse=True)
+    def bind_app(self, app_module, monkeypatch):
+        """Serve one character from a fake API and freeze the app's clock."""
+        self.app = app_module
+        self.clock = FakeClock()
+        self.requests = []
+        self.status = 200
+
+        def handler(request):
+            self.requests.append(request.headers.get("if-none-match"))
+            if self.status != 200:
+                return httpx.Response(self.status)
+            if request.headers.get("if-none-match") == '"p1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={"id": "cathy", "system_prompt": "You are Cathy."}, headers={"etag": '"p1"'})
+
+        monkeypatch.setattr(app_module, "time", self.clock)
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(app_module.CFG, char_url="http://char.test", char_private_ttl=60))
+        monkeypatch.setattr(app_module, "char_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        for name in ("CHAR_PRIVATE_CACHE", "CHAR_PRIVATE_ETAGS", "CHAR_PRIVATE_EXPIRY"):
+            monkeypatch.setattr(app_module, name, {})
+
+    def fetch(self) -> dict:
+        """Fetch the private character data once."""
+        return asyncio.run(self.app.fetch_character_private("cathy"))
+
+    def test_hit_within_ttl(self):
+        """A second fetch inside the TTL is served without a request."""
+        first = self.fetch()
+        self.clock.now += 59
+        assert self.fetch() is first
+        assert self.requests == [None]
+
+    def test_revalidates_after_expiry(self):
+        """An expired entry is revalidated and a 304 renews its TTL."""
+        first = self.fetch()
+        self.clock.now += 61
+        assert self.fetch() is first
+        assert self.requests == [None, '"p1"']
+
+        self.clock.now += 59
+        assert self.fetch() is first
+        assert len(self.requests) == 2
+
+    def test_failed_fetch_not_cached(self):
+        """An error response leaves nothing cached, so the next call refetches."""
+        self.status = 500
+        with pytest.raises(httpx.HTTPStatusError):
+            self.fetch()
+        assert self.app.CHAR_PRIVATE_CACHE == {}
+
+        self.status = 200
+        assert self.fetch()["id"] == "cathy"
+        assert self.requests == [None, None]
+
+
+class TestEmotionBatching:
+    """Behaviour tests for the emotion batch worker."""
+
+    def test_cancelled_worker_releases_waiters(self, app_module, monkeypatch):
+        """Callers waiting on a cancelled worker get None instead of hanging."""
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(
+            app_module.CFG, emotion_enabled=True, emotion_url="http://emotion.test", emotion_batch_max=4))
+        monkeypatch.setattr(app_module, "_emotion_worker", None)
+        monkeypatch.setattr(app_module, "_EMOTION_CACHE", app_module.OrderedDict())
+
+        async def never_answers(texts):
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(app_module, "_post_emotion_batch", never_answers)
+
+        async def run():
+            waiters = [asyncio.create_task(app_module.detect_emotion(t)) for t in ("one", "two")]
+            await asyncio.sleep(app_module.EMOTION_BATCH_WINDOW * 2)
+            # A third caller is still queued when the worker stops
+            waiters.append(asyncio.create_task(app_module.detect_emotion("three")))
+            await asyncio.sleep(0)
+            app_module._emotion_worker.cancel()
+            return await asyncio.wait_for(asyncio.gather(*waiters), 1)
+
+        assert asyncio.run(run()) == [None, None, None]
+
+
+class TestSessionEventLog:
+    """Behaviour tests for the buffered session event log."""
+
+    def test_turn_end_flushes_log(self, app_module, monkeypatch, tmp_path):
+        """Events stay buffered mid-turn and reach disk when the turn ends."""
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(app_module.CFG, state_dir=tmp_path))
+        meta = ("p1", "cathy", "ext", "chainlit:s1")
+        log = tmp_path / "sessions" / "p1" / "cathy" / "chainlit_s1.ndjson"
+
+        def on_disk() -> list[str]:
+            # Wait for queued writes on the event-log thread
+            app_module._EVENT_EXECUTOR.submit(lambda: None).result()
+            return [orjson.loads(line)["sender"] for line in log.read_bytes().splitlines()]
+
+        try:
+            app_module.append_event("user", "hi", meta)
+            assert on_disk() == []
+            app_module.append_event("assistant", "hello", meta, flush=True)
+            assert on_disk() == ["user", "assistant"]
+        finally:
+            app_module._EVENT_EXECUTOR.submit(app_module.close_event_logs, "chainlit:s1").result()
+
+
+def fake_chainlit(session: dict) -> SimpleNamespace:
+    """Build a stand-in for the chainlit module backed by a plain dict session.
+
+    Every message the app creates is recorded in ``messages``.
+
+    :param session: Initial user session values
+    :type session: dict
+    :return: Object exposing ``user_session``, ``Message`` and ``messages``
+    :rtype: SimpleNamespace
+    """
+    messages = []
+
+    class Message:
+        def __init__(self, content="", author=None, **kwargs):
+            self.content = content
+            self.author = author
+            self.tokens = []
+            messages.append(self)
+
+        async def send(self):
+            pass
+
+        async def stream_token(self, token):
+            self.tokens.append(token)
+
+        async def update(self):
+            pass
+
+    user_session = SimpleNamespace(get=session.get, set=session.__setitem__)
+    return SimpleNamespace(user_session=user_session, Message=Message, messages=messages)
+
+
+@pytest.fixture
+def chat_app(app_module, monkeypatch):
+    """Run ``app.main`` turns against a fake chainlit session and chat stream.
+
+    Append a token list to ``replies`` for each turn; ``calls`` records the
+    messages each turn sent upstream, and ``turn`` returns the reply message.
+    """
+    session = {
+        "char": {"id": "cathy", "name": "Cathy"},
+        "model_available": True,
+        "default_model": "m",
+        "system_msg": app_module.Msg("system", "You are Cathy."),
+        "author_label": "Cathy",
+    }
+    # chainlit is a Mock here, so @cl.on_message replaced main; take the original back
+    main = app_module.cl.on_message.call_args.args[0]
+    cl = fake_chainlit(session)
+    harness = SimpleNamespace(session=session, replies=[], calls=[])
+
+    async def stream_chat(model, messages):
+        harness.calls.append(list(messages))
+        for token in harness.replies.pop(0):
+            yield token
+
+    def turn(text: str):
+        async def run():
+            await main(SimpleNamespace(content=text))
+            # Let background work such as the emotion post finish
+            await asyncio.gather(*app_module._BG_TASKS)
+        start = len(cl.messages)
+        asyncio.run(run())
+        return cl.messages[start]
+
+    harness.turn = turn
+    monkeypatch.setattr(app_module, "cl", cl)
+    monkeypatch.setattr(app_module, "stream_chat", stream_chat)
+    monkeypatch.setattr(app_module, "append_event", lambda *args, **kwargs: None)
+    return harness
+
+
+class TestStreamCoalescing:
+    """Behaviour tests for batching streamed tokens into UI frames."""
+
+    TOKENS = ["ab", "cd", "efgh", "ij", "k", "lmnopqrs", "t"]
+
+    @pytest.fixture(autouse=True)
+    def bind_app(self, app_module, monkeypatch):
+        """Flush on an 8-character buffer only, with emotion detection off."""
+        self.app = app_module
+        self.monkeypatch = monkeypatch
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(app_module.CFG, emotion_enabled=False, stream_buf_chars=8))
+        monkeypatch.setattr(app_module, "STREAM_FLUSH_INTERVAL", 3600)
+
+    def test_flushes_at_char_threshold(self, chat_app):
+        """Tokens are sent once 8 characters are buffered, then the tail."""
+        chat_app.replies.append(self.TOKENS)
+        msg = chat_app.turn("hi")
+        assert msg.tokens == ["abcdefgh", "ijklmnopqrs", "t"]
+        assert "".join(msg.tokens) == "".join(self.TOKENS)
+
+    def test_flushes_on_interval(self, chat_app):
+        """An elapsed flush interval sends each token as it arrives."""
+        self.monkeypatch.setattr(self.app, "STREAM_FLUSH_INTERVAL", -1)
+        chat_app.replies.append(self.TOKENS)
+        assert chat_app.turn("hi").tokens == self.TOKENS
+
+    def test_short_reply_sent_as_tail(self, chat_app):
+        """A reply under the threshold arrives in one final flush."""
+        chat_app.replies.append(["Hi", "!"])
+        assert chat_app.turn("hi").tokens == ["Hi!"]
+
+
+class TestEmotionGate:
+    """Behaviour tests for skipping and caching emotion API calls."""
+
+    @pytest.fixture(autouse=True)
+    def bind_app(self, app_module, monkeypatch):
+        """Answer emotion requests from a fake API and record the texts sent."""
+        self.app = app_module
+        self.texts = []
+
+        def handler(request):
+            self.texts.append(orjson.loads(request.content)["text"])
+            return httpx.Response(200, json={"label": "joy", "score": 0.9})
+
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(
+            app_module.CFG, emotion_enabled=True, emotion_url="http://emotion.test", emotion_batch_max=1))
+        monkeypatch.setattr(app_module, "client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(app_module, "_EMOTION_CACHE", app_module.OrderedDict())
+
+    def detect(self, text: str):
+        """Classify one text."""
+        return asyncio.run(self.app.detect_emotion(text))
+
+    def test_repeated_text_uses_cache(self):
+        """The same text is only sent to the API once."""
+        text = "What a lovely day it is today!"
+        assert self.detect(text) == {"label": "joy", "score": 0.9}
+        assert self.detect(text) == {"label": "joy", "score": 0.9}
+        assert self.texts == [text]
+
+    def test_cache_is_bounded(self, monkeypatch):
+        """The LRU keeps the newest EMOTION_CACHE_MAX texts."""
+        monkeypatch.setattr(self.app, "EMOTION_CACHE_MAX", 3)
+        texts = [f"reply number {i} is long enough" for i in range(5)]
+        for text in texts:
+            self.detect(text)
+        assert list(self.app._EMOTION_CACHE) == texts[-3:]
+
+        self.detect(texts[-1])
+        assert len(self.texts) == 5
+        self.detect(texts[0])
+        assert len(self.texts) == 6
+
+    @pytest.mark.parametrize("reply, sent", [
+        ("Okay!", 0),
+        ("⚠️ Chat API error: timed out", 0),
+        ("That's wonderful news, congratulations!", 1),
+    ], ids=["short", "error", "normal"])
+    def test_short_and_error_replies_skip_api(self, chat_app, reply, sent):
+        """Only replies worth classifying reach the emotion API."""
+        chat_app.replies.append([reply])
+        chat_app.turn("hi")
+        assert len(self.texts) == sent
+
+
+class TestChatHistory:
+    """Behaviour tests for the bounded chat history sent upstream."""
+
+    def test_system_prompt_first_and_oldest_turns_dropped(self, app_module, chat_app, monkeypatch):
+        """Every request starts with the system prompt; only HISTORY_TURNS turns follow."""
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(app_module.CFG, emotion_enabled=False))
+        monkeypatch.setattr(app_module, "HISTORY_TURNS", 4)
+        transcript = []
+        for i in range(5):
+            chat_app.replies.append([f"reply {i}"])
+            chat_app.turn(f"message {i}")
+            transcript += [app_module.Msg("user", f"message {i}"), app_module.Msg("assistant", f"reply {i}")]
+
+        system_msg = chat_app.session["system_msg"]
+        assert chat_app.calls[0] == [system_msg, transcript[0]]
+        for sent in chat_app.calls:
+            assert sent[0] is system_msg
+            assert len(sent) <= 1 + 4
+        # The last request carries the newest turns, ending with the current message
+        assert chat_app.calls[-1][1:] == transcript[-5:-1]
+        assert list(chat_app.session["history"]) == transcript[-4:]
+
+
+class TestCharacterListCache:
+    """Behaviour tests for the character list ETag cache."""
+
+    @pytest.fixture(autouse=True)
+    def bind_app(self, app_module, monkeypatch, tmp_path):
+        """Point the character cache at a temp dir and record list requests."""
+        self.app = app_module
+        self.cache = tmp_path / "characters.json"
+        self.requests = []
+        self.body = orjson.dumps({"characters": [{"id": "cathy", "name": "Cathy"}]})
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(app_module.CFG, char_url="http://char.test"))
+        monkeypatch.setattr(app_module, "CHAR_CACHE_PATH", self.cache)
+        monkeypatch.setattr(app_module, "CHAR_CACHE_ETAG_PATH", tmp_path / "characters.etag")
+        monkeypatch.setattr(app_module, "_CHAR_CACHE_MEMO", None)
+        monkeypatch.setattr(app_module, "_CHAR_LIST_ETAG", '"v1"')
+        self.monkeypatch = monkeypatch
+
+    def fetch(self, on_request=None):
+        """Run fetch_characters_list against a server that answers 304 to a matching ETag."""
+        def handler(request):
+            self.requests.append(request.headers.get("if-none-match"))
+            if on_request:
+                on_request()
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, content=self.body, headers={"etag": '"v1"'})
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            self.monkeypatch.setattr(self.app, "char_client", client)
+            try:
+                return await self.app.fetch_characters_list()
+            finally:
+                await client.aclose()
+        return asyncio.run(run())
+
+    def test_no_revalidation_without_cache(self):
+        """A remembered ETag is not sent when the cache file is gone."""
+        chars = self.fetch()
+        assert [c["id"] for c in chars] == ["cathy"]
+        assert self.requests == [None]
+        assert self.cache.read_bytes() == self.body
+
+    def test_refetch_when_cache_vanishes_after_304(self):
+        """A 304 with an empty cache clears the ETag and fetches the full list."""
+        self.cache.write_bytes(self.body)
+        chars = self.fetch(on_request=lambda: self.cache.unlink(missing_ok=True))
+        assert [c["id"] for c in chars] == ["cathy"]
+        assert self.requests == ['"v1"', None]
+
+    def test_304_uses_cache(self):
+        """A 304 with cached data serves the cache without a second request."""
+        self.cache.write_bytes(self.body)
+        chars = self.fetch()
+        assert [c["id"] for c in chars] == ["cathy"]
+        assert self.requests == ['"v1"']
+
+
+class TestListCacheTTL:
+    """Behaviour tests for the in-memory character list and model list TTLs."""
+
+    @pytest.fixture(autouse=True)
+    def bind_app(self, app_module, monkeypatch, tmp_path):
+        """Serve both lists from a fake API, freeze the clock and clear the caches."""
+        self.app = app_module
+        self.clock = FakeClock()
+        self.requests = []
+        self.status = 200
+        body = orjson.dumps({"characters": [{"id": "cathy", "name": "Cathy"}]})
+
+        def handler(request):
+            self.requests.append(request.url.path)
+            if self.status != 200:
+                return httpx.Response(self.status)
+            if request.url.path == "/models":
+                return httpx.Response(200, json={"models": ["m1"]})
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, content=body, headers={"etag": '"v1"'})
+
+        fake_api = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(app_module, "time", self.clock)
+        monkeypatch.setattr(app_module, "CFG", dataclasses.replace(
+            app_module.CFG, char_url="http://char.test", models_url="http://models.test/models",
+            char_list_ttl=30, models_cache_ttl=30))
+        monkeypatch.setattr(app_module, "char_client", fake_api)
+        monkeypatch.setattr(app_module, "client", fake_api)
+        monkeypatch.setattr(app_module, "CHAR_CACHE_PATH", tmp_path / "characters.json")
+        monkeypatch.setattr(app_module, "CHAR_CACHE_ETAG_PATH", tmp_path / "characters.etag")
+        monkeypatch.setattr(app_module, "_CHAR_CACHE_MEMO", None)
+        monkeypatch.setattr(app_module, "_CHAR_LIST_ETAG", "")
+        monkeypatch.setattr(app_module, "CHAR_LIST", [])
+        monkeypatch.setattr(app_module, "CHAR_INDEX", {})
+        monkeypatch.setattr(app_module, "PROFILE_NAME_TO_ID", {})
+        monkeypatch.setattr(app_module, "_CHAR_LIST_EXPIRY", 0.0)
+        monkeypatch.setattr(app_module, "_MODELS_CACHE", None)
+
+    def load(self) -> list[dict]:
+        """Load the character list once."""
+        return asyncio.run(self.app.load_characters())
+
+    def models(self) -> list[str]:
+        """Fetch the model list once."""
+        return asyncio.run(self.app.fetch_models())
+
+    def test_character_list_ttl(self):
+        """The list is served from memory within the TTL and refreshed after it."""
+        chars = self.load()
+        self.clock.now += 29
+        assert self.load() is chars
+        assert self.requests == ["/characters"]
+
+        self.clock.now += 2
+        assert self.load() is chars
+        assert self.requests == ["/characters", "/characters"]
+        assert set(self.app.CHAR_INDEX) == {"cathy"}
+
+    def test_failed_list_refresh_not_cached(self):
+        """A failed refresh serves the cache file without starting a new TTL."""
+        self.load()
+        self.clock.now += 31
+        self.status = 500
+        assert [c["id"] for c in self.load()] == ["cathy"]
+
+        self.status = 200
+        self.load()
+        assert self.requests == ["/characters"] * 3
+
+    def test_models_ttl(self):
+        """Models are served from memory within the TTL and refetched after it."""
+        assert self.models() == ["m1"]
+        self.clock.now += 29
+        assert self.models() == ["m1"]
+        assert self.requests == ["/models"]
+
+        self.clock.now += 2
+        assert self.models() == ["m1"]
+        assert self.requests == ["/models", "/models"]
+
+    def test_failed_models_fetch_not_cached(self):
+        """A failed models request returns nothing and is retried on the next call."""
+        self.status = 500
+        assert self.models() == []
+        self.status = 200
+        assert self.models() == ["m1"]
+        assert self.requests == ["/models", "/models"]
@@ -8,6 +8,9 @@ from pathlib import Path
 from passlib.hash import bcrypt
 
 USER_DB_PATH = Path(os.getenv("USER_DB_PATH", "/state/users.sqlite"))
+# bcrypt work factor for new hashes; existing hashes verify at their own cost
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+_pw_hasher = bcrypt.using(rounds=BCRYPT_ROUNDS)
 
 def init_db():
     """Initialize database schema if not exists.
@@ -90,7 +93,7 @@ def create_user(username: str, password: str, role: str = "user", invite_code: s
         )
     
     # Create user
-    pw_hash = bcrypt.hash(password)
+    pw_hash = _pw_hasher.hash(password)
     conn.execute(
         "INSERT INTO users (username, pw_hash, role, created_at) VALUES (?, ?, ?, ?)",
         (username, pw_hash, role, datetime.now(timezone.utc).isoformat())
@@ -295,7 +298,7 @@ def upsert_user(username: str, password: str, role: str = "user") -> tuple[bool,
     row = conn.execute("SELECT username FROM users WHERE username=?", (username,)).fetchone()
 
     if not row:
-        pw_hash = bcrypt.hash(password)
+        pw_hash = _pw_hasher.hash(password)
         conn.execute(
             "INSERT INTO users (username, pw_hash, role, is_active, created_at) VALUES (?, ?, ?, 1, ?)",
             (username, pw_hash, role, datetime.now(timezone.utc).isoformat())